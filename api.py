@@ -0,0 +1,158 @@
+# api.py
+#
+# JSON query API over the aggregated sales, for programmatic clients. Nothing
+# here renders HTML or Plotly figures.
+
+from flask import Blueprint, jsonify
+from response_cache import cached, filter_param, filter_values, request_params
+from metrics import stage
+
+# Initialize the Blueprint
+api_bp = Blueprint('api_bp', __name__, url_prefix='/api')
+
+# Filter parameters, named like the SalesCube.sum() arguments
+FILTERS = ('vehicle_type', 'province', 'make', 'model')
+
+# Most results /api/search returns
+MAX_SEARCH_LIMIT = 50
+
+# Group-by dimensions and the SalesCube axis each one groups on. Grouping on
+# 'model' groups on make and model pairs, with both in the output.
+DIMENSIONS = {'month': 'month', 'province': 'province', 'type': 'type', 'make': 'make', 'model': 'vehicle'}
+
+
+def query_sales(cube, group_by=(), top=None, start=None, end=None, **filters):
+    """
+    Sum sales by any dimensions, with any filters.
+
+    Filters are translated to axis codes and the sums are slices of the cube,
+    so no row is scanned or compared by name.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        group_by (list): Dimensions to group on, in output order, see DIMENSIONS.
+        top (int): Only return the `top` rows with the most sales, None for every row.
+        start (int): First month code, None for the first month in the data.
+        end (int): Last month code, None for the last month in the data.
+        **filters: vehicle_type, province, make and model filters, see SalesCube.sum().
+
+    Returns:
+        dict: 'group_by', 'total' sales, the number of 'rows' and their 'columns': one list per
+            dimension ('month' as YYYY-MM, 'model' with a 'make' column too) and 'sales'.
+            Groups without sales are left out. Rows are in dimension order, or by sales in
+            descending order with `top`.
+
+    Raises:
+        ValueError: For an unknown dimension or a `top` below 1.
+    """
+    import numpy as np
+    from data_loader import month_label
+
+    for dimension in group_by:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown group_by '{dimension}', expected any of {', '.join(DIMENSIONS)}")
+    if top is not None and top < 1:
+        raise ValueError("top must be at least 1")
+
+    # Make and model together group on the vehicle axis once
+    group_by = list(dict.fromkeys(group_by))
+    by = tuple(dict.fromkeys(
+        'vehicle' if 'model' in group_by and dimension == 'make' else DIMENSIONS[dimension]
+        for dimension in group_by
+    ))
+
+    sales = cube.sum(by=by, start=start, end=end, **filters)
+    if not by:
+        return {'group_by': [], 'total': sales, 'rows': 1, 'columns': {'sales': [sales]}}
+
+    # Groups with sales, in dimension order or by sales
+    index = np.nonzero(sales)
+    values = sales[index]
+    if top is not None:
+        order = np.argsort(-values, kind='stable')[:top]
+        index = tuple(codes[order] for codes in index)
+        values = values[order]
+
+    labels = {
+        'month': [month_label(code, '%Y-%m') for code in cube.month_codes(start, end)],
+        'province': cube.provinces,
+        'type': cube.vehicle_types,
+        'make': cube.makes,
+    }
+    columns = {}
+    for axis, codes in zip(by, index):
+        if axis == 'vehicle':
+            columns['make'] = np.asarray(cube.makes, dtype=object)[cube.vehicle_make[codes]].tolist()
+            columns['model'] = np.asarray(cube.vehicle_models, dtype=object)[codes].tolist()
+        else:
+            columns[axis] = np.asarray(labels[axis], dtype=object)[codes].tolist()
+    columns['sales'] = values.tolist()
+
+    return {'group_by': group_by, 'total': int(sales.sum()), 'rows': len(values), 'columns': columns}
+
+
+@api_bp.route('/sales', methods=['GET', 'POST'])
+@cached(*FILTERS, 'group_by', 'start', 'end', 'top', multi=(*FILTERS, 'group_by'))
+def sales():
+    """
+    Query sales, e.g. /api/sales?group_by=make&group_by=month&province=Quebec&start=2024-01&top=10.
+
+    Filters (vehicle_type, province, make, model) can be repeated to select
+    several values. group_by can be repeated or comma separated, start and end
+    are inclusive YYYY-MM months.
+    """
+    from data_loader import get_dataset, parse_month
+
+    try:
+        group_by = [
+            dimension.strip()
+            for value in filter_values('group_by') if value != 'All'
+            for dimension in value.split(',') if dimension.strip()
+        ]
+        start, end, top = (filter_param(name) for name in ('start', 'end', 'top'))
+        if top != 'All' and not top.isdigit():
+            raise ValueError("top must be a positive integer")
+        filters = {name: None if filter_values(name) == ('All',) else list(filter_values(name)) for name in FILTERS}
+        cube = get_dataset().cube
+        cube.check_filters(filters['vehicle_type'], filters['province'])
+        with stage('aggregate'):
+            result = query_sales(
+                cube,
+                group_by=group_by,
+                top=None if top == 'All' else int(top),
+                start=None if start == 'All' else parse_month(start),
+                end=None if end == 'All' else parse_month(end),
+                **filters,
+            )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with stage('serialize'):
+        return jsonify(result)
+
+
+@api_bp.route('/search', methods=['GET', 'POST'])
+def search():
+    """
+    Search make and model names as you type, e.g. /api/search?q=ioniq&limit=5.
+
+    Matches are ranked by search_index.SearchIndex.search() and carry their
+    latest month and past year sales. Not cached: searches are answered from
+    the index built with the dataset.
+    """
+    from data_loader import get_dataset, month_label
+    from search_index import SEARCH_LIMIT
+
+    query = str(request_params().get('q') or '').strip()
+    limit = str(request_params().get('limit') or SEARCH_LIMIT).strip()
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_SEARCH_LIMIT:
+        return jsonify({'error': f"limit must be an integer from 1 to {MAX_SEARCH_LIMIT}"}), 400
+
+    index = get_dataset().search
+    with stage('search'):
+        results = index.search(query, int(limit))
+    with stage('serialize'):
+        return jsonify({
+            'query': query,
+            'latest_month': month_label(index.latest_month, '%Y-%m') if index.latest_month is not None else None,
+            'results': results,
+        })
@@ -1,391 +1,342 @@
 # app.py
 
-from flask import Flask, render_template, request, jsonify
-from data_loader import load_data, get_unique_values
+from flask import Flask, render_template, jsonify
+import click
 from brand_sales import brand_sales_bp  # Import the Blueprint
-import plotly.express as px
-import plotly
-import json
-import pandas as pd
-from datetime import datetime
+from api import api_bp
+from export import export_bp
+from charts import CompactJSONProvider, charts_bp
+from metrics import metrics_bp, stage
+from model_sales import model_sales_bp
+from prerender import PRERENDER_DIR, build as build_artifacts
+from response_cache import cached, filter_param, filter_values, response_cache
+from warmup import readiness, start_warm_up
+import os
+
+# pandas and the data layer (data_loader, sales_tables) are imported
+# inside the views, so the app and /healthz are up before they are loaded
 
 app = Flask(__name__)
 
-# Step 2: Load and preprocess data using data_loader.py
-df = load_data()
+# Send JSON and HTML without the whitespace that does not change them: no spaces in
+# JSON, including the figures embedded in pages, and no blank lines left by template tags
+app.json = CompactJSONProvider(app)
+app.jinja_env.trim_blocks = True
+app.jinja_env.lstrip_blocks = True
 
-# Combine Vehicle Make and Model
-df['Make and Model'] = df['Vehicle Make'] + ' ' + df['Vehicle Model']
-df['Month and Year'] = pd.to_datetime(df['Month and Year'], format='%b %Y')  # Adjust format as needed
+# Step 2: Load and preprocess data into the shared store (data_loader.get_dataset) in the
+# background, and reload it whenever the data file changes. Requests arriving earlier wait
+# for the load, /readyz reports when it is done.
+start_warm_up()
 
-# Step 3: Extract unique vehicle types and provinces/territories
-vehicle_types, available_provinces, _ = get_unique_values(df)
+# Register the Blueprints
+app.register_blueprint(brand_sales_bp)
+app.register_blueprint(charts_bp)
+app.register_blueprint(api_bp)
+app.register_blueprint(export_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(model_sales_bp)
 
-# Extract unique Make and Model for vehicle models selection
-vehicle_models = sorted(df['Make and Model'].unique())
 
-# Register the Blueprint
-app.register_blueprint(brand_sales_bp)
+def best_selling_cars(cube, month, vehicle_type=None, n=10):
+    """
+    Return the top `n` make/model pairs by sales in `month`.
+
+    Returns:
+        tuple: ('Make Model' names, sales), in descending order of sales.
+    """
+    import numpy as np
+
+    sales = cube.sum(by=('vehicle',), vehicle_type=vehicle_type, start=month, end=month)
+    top = np.argsort(-sales, kind='stable')[:n]
+    top = top[sales[top] > 0]
+    return [f'{make} {model}' for make, model in cube.vehicle_names(top)], sales[top]
+
+
+def sales_over_time_chart(cube, vehicle_type, monthly_sales):
+    """
+    Build the sales over time line chart.
+
+    Months without any sales for the selected filters are left out, as they
+    have no rows in the source data.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        vehicle_type (str): Vehicle type filtered on, 'All' for every type.
+        monthly_sales (np.ndarray): Sales of each cube month, with the filter applied.
+    """
+    from figures import sales_over_time_figure
+
+    title = 'Total Sales Over Time'
+    if vehicle_type != 'All':
+        title = f'Total Sales Over Time for {vehicle_type}'
+    present = monthly_sales > 0
+    with stage('figure'):
+        return sales_over_time_figure(cube.months[present], monthly_sales[present], title)
+
+
+def best_selling_cars_chart(cube, vehicle_type, monthly_sales):
+    """
+    Build the best selling cars bar chart, for the latest month with sales.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        vehicle_type (str): Vehicle type filtered on, 'All' for every type.
+        monthly_sales (np.ndarray): Sales of each cube month, with the filter applied.
+
+    Returns:
+        dict: The chart, None when no car sold that month.
+    """
+    from data_loader import month_label
+    from figures import best_selling_cars_figure
+
+    present_months = cube.months[monthly_sales > 0]
+    latest_month = int(present_months[-1]) if len(present_months) else cube.latest_month
+    with stage('aggregate'):
+        names, sales = best_selling_cars(cube, latest_month, vehicle_type)
+    if not names:
+        # Rendered client-side as a 'no data' message
+        return None
+    # Extract the actual month name
+    latest_month_str = month_label(latest_month, '%B %Y')
+    with stage('figure'):
+        return best_selling_cars_figure(names, sales, f'Best Selling Cars in {latest_month_str}')
+
+
+def province_sales_chart(cube, province_time_sales):
+    """
+    Build the sales by province/territory chart.
+
+    Provinces are sorted by sales in the latest month with sales (ties in
+    alphabetical order, like the rows of sales_tables.province_sales_table()), the top 4 are
+    shown and the others only listed in the legend. The past year is shown by default.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        province_time_sales (np.ndarray): Sales by cube month and province, with the filters applied.
+
+    Returns:
+        dict: The chart, see figures.province_sales_figure().
+    """
+    import numpy as np
+    from figures import province_sales_figure
+
+    # Show the past year up to the latest month in the data by default
+    end_month = cube.latest_month
+    x_range = (end_month - 12, end_month)
+
+    with stage('aggregate'):
+        # Keep the months and provinces that have sales, with months as x-axis and provinces as lines
+        months_with_sales = province_time_sales.sum(axis=1) > 0
+        provinces_with_sales = province_time_sales.sum(axis=0) > 0
+        sales = province_time_sales[np.ix_(months_with_sales, provinces_with_sales)]
+        provinces = [name for name, keep in zip(cube.provinces, provinces_with_sales) if keep]
+
+    # **New Code Starts Here**
+    # Sort all provinces based on sales in the latest month, in descending order with
+    # ties in alphabetical order, as in the Sales Summary table
+    latest_sales = sales[-1] if len(sales) else np.zeros(len(provinces), dtype=sales.dtype)
+    order = np.argsort(-latest_sales, kind='stable')
+    sales = sales[:, order]
+    provinces = [provinces[i] for i in order]
+    # **New Code Ends Here**
+
+    # Show the top 4 provinces based on the most recent month's sales
+    top_provinces = set(provinces[:4])
+
+    with stage('figure'):
+        return province_sales_figure(cube.months[months_with_sales], provinces, sales, top_provinces, x_range)
+
+
+# Panels of the dashboard, see dashboard_panels()
+PANELS = ('sales_over_time', 'best_sellers', 'province_table', 'province_chart', 'brand_table')
+
+
+def dashboard_panels(cube, panels=PANELS, vehicle_type='All', province='All'):
+    """
+    Build any panels of the dashboard for one set of filters.
+
+    The home page panels share one aggregate, sales by month and province for
+    the vehicle type, computed once however many of them are requested.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        panels (list): Names of the panels to build, see PANELS.
+        vehicle_type (str): Vehicle type to filter on, 'All' for every type.
+        province (str): Province/territory to filter the brand table on, 'All' for every one. The
+            home page panels cover every province, as on the home page.
+
+    Returns:
+        dict: Panels by name, in PANELS order: 'sales_over_time' and 'province_chart' figures,
+            the 'best_sellers' figure (None without sales), the 'province_table' (see
+            province_sales_table()) and the 'brand_table' (see brand_sales_data()).
+
+    Raises:
+        ValueError: For an unknown panel, vehicle type or province.
+    """
+    from brand_sales import brand_sales_data
+    from sales_tables import province_sales_table
+
+    for name in panels:
+        if name not in PANELS:
+            raise ValueError(f"Unknown panel '{name}', expected any of {', '.join(PANELS)}")
+    cube.check_filters(vehicle_type, province)
+
+    data = {}
+    if set(panels) & {'sales_over_time', 'best_sellers', 'province_table', 'province_chart'}:
+        with stage('aggregate'):
+            # Sales by month and province, filtered by vehicle type only
+            month_province = cube.sum(by=('month', 'province'), vehicle_type=vehicle_type)
+            monthly_sales = month_province.sum(axis=1)
+    if 'sales_over_time' in panels:
+        data['sales_over_time'] = sales_over_time_chart(cube, vehicle_type, monthly_sales)
+    if 'best_sellers' in panels:
+        data['best_sellers'] = best_selling_cars_chart(cube, vehicle_type, monthly_sales)
+    if 'province_table' in panels:
+        with stage('aggregate'):
+            data['province_table'] = province_sales_table(cube, vehicle_type, pivot=month_province.T)
+    if 'province_chart' in panels:
+        data['province_chart'] = province_sales_chart(cube, month_province)
+    if 'brand_table' in panels:
+        with stage('aggregate'):
+            data['brand_table'] = brand_sales_data(cube, vehicle_type, province)
+    return data
+
 
 @app.route('/')
+@cached()
 def index():
-    # Load and preprocess data
-    df = load_data()
-    if df.empty:
+    from data_loader import get_dataset
+
+    # Read from the shared, already aggregated dataset
+    dataset = get_dataset()
+    if dataset.df.empty:
         return "Data not loaded correctly."
-    df['Month and Year'] = pd.to_datetime(df['Month and Year'], format='%b %Y')  # Adjust format as needed
-
-    # Generate Total Sales Over Time graph
-    sales_over_time = df.groupby('Month and Year')['Number of Cars'].sum().reset_index()
-    fig = px.line(
-        sales_over_time,
-        x='Month and Year',
-        y='Number of Cars',
-        title='Total Sales Over Time',
-        labels={'Number of Cars': 'Sales'},
-        template='plotly_white'
-    )
-    fig.update_traces(line=dict(width=2))
-    fig.update_layout(
-        xaxis_title='Month and Year',
-        yaxis_title='Number of Cars',
-        title_x=0.5
-    )
-    fig.update_traces(hovertemplate='%{x|%b %Y}<br>Sales: %{y}')
-
-    # Convert the Plotly figure to HTML
-    graph_html = fig.to_html(full_html=False, config={'displayModeBar': False, 'responsive': True})
-
-    # Best Selling Cars Bar Chart
-    last_available_month = df['Month and Year'].max()
-    latest_month_data = df[df['Month and Year'] == last_available_month]
-    best_selling_cars = (
-        latest_month_data.groupby(['Vehicle Make', 'Vehicle Model'])['Number of Cars']
-        .sum()
-        .nlargest(10)
-        .reset_index()
-    )
-    # Combine Vehicle Make and Model for display
-    best_selling_cars['Make and Model'] = best_selling_cars['Vehicle Make'] + ' ' + best_selling_cars['Vehicle Model']
-    # Extract the actual month name
-    latest_month_str = last_available_month.strftime('%B %Y')
-    bar_fig = px.bar(
-        best_selling_cars,
-        x='Make and Model',
-        y='Number of Cars',
-        title=f'Best Selling Cars in {latest_month_str}',
-        labels={'Number of Cars': 'Sales'},
-        template='plotly_white'
-    )
-    bar_fig.update_layout(
-        xaxis_title='Car Model',
-        yaxis_title='Number of Cars',
-        title_x=0.5
-    )
-    bar_graph_html = bar_fig.to_html(full_html=False, config={'displayModeBar': False, 'responsive': True})
-
-    # -------------------------- Table Data Calculation -------------------------- #
-    # Identify the latest month in the dataset
-    latest_month = df['Month and Year'].max()
-
-    # Determine the last 6 months
-    all_months_sorted = df['Month and Year'].sort_values().drop_duplicates()
-    last_6_months = all_months_sorted[all_months_sorted <= latest_month].iloc[-6:]
-    last_6_months = last_6_months[::-1]  # Reverse to have latest first
-
-    # Labels for the last 6 months
-    last_6_months_labels = [month.strftime('%b %Y') for month in last_6_months]
-
-    # Define date ranges
-    ytd_start = pd.Timestamp(year=latest_month.year, month=1, day=1)
-    one_year_ago = latest_month - pd.DateOffset(years=1) + pd.DateOffset(days=1)
-
-    # Calculate Total Sales
-    total_last_6_months = df[df['Month and Year'].isin(last_6_months)]['Number of Cars'].sum()
-    ytd_sales = df[(df['Month and Year'] >= ytd_start) & (df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-    one_year_sales = df[(df['Month and Year'] >= one_year_ago) & (df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-    # Canada sales per month for last 6 months
-    canada_sales = df[df['Month and Year'].isin(last_6_months)].groupby('Month and Year')['Number of Cars'].sum().reindex(last_6_months).fillna(0)
-
-    # Total Canada sales
-    total_canada_last_6 = canada_sales.sum()
-    canada_ytd = df[(df['Month and Year'] >= ytd_start) & (df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-    canada_one_year = df[(df['Month and Year'] >= one_year_ago) & (df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-    # Prepare a list of provinces/territories sorted descending by latest month sales
-    latest_month_sales_per_province = df[df['Month and Year'] == latest_month].groupby('Province/Territory')['Number of Cars'].sum()
-    sorted_provinces = latest_month_sales_per_province.sort_values(ascending=False).index.tolist()
-
-    # Initialize table data
-    table_data = []
-
-    # First row: Canada with Priority 0
-    canada_row = {
-        'Priority': 0,
-        'Province': 'Canada',
-        'Last 6 Months': [int(canada_sales[month]) for month in last_6_months],
-        'Total Last 6 Months': int(total_canada_last_6),
-        'YTD': int(canada_ytd),
-        '1 Year': int(canada_one_year)
-    }
-    table_data.append(canada_row)
-
-    # Next rows: per province/territory with Priority 1
-    for province in sorted_provinces:
-        province_df = df[df['Province/Territory'] == province]
-
-        # Sales for last 6 months
-        province_sales_last_6 = province_df[province_df['Month and Year'].isin(last_6_months)].groupby('Month and Year')['Number of Cars'].sum().reindex(last_6_months).fillna(0)
-
-        # Total last 6 months
-        total_province_last_6 = province_sales_last_6.sum()
-
-        # YTD sales
-        province_ytd = province_df[(province_df['Month and Year'] >= ytd_start) & (province_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-        # 1-year sales
-        province_one_year = province_df[(province_df['Month and Year'] >= one_year_ago) & (province_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-        province_row = {
-            'Priority': 1,
-            'Province': province,
-            'Last 6 Months': [int(sales) for sales in province_sales_last_6],
-            'Total Last 6 Months': int(total_province_last_6),
-            'YTD': int(province_ytd),
-            '1 Year': int(province_one_year)
-        }
-
-        table_data.append(province_row)
-
-    # -------------------------- Date Range Calculations for Tooltips -------------------------- #
-    # Total Last 6 Months Range
-    total_last_6_months_range = f"{last_6_months.iloc[-1].strftime('%b %Y')} - {last_6_months.iloc[0].strftime('%b %Y')}"
-
-    # YTD Range
-    ytd_range = f"{ytd_start.strftime('%b %Y')} - {latest_month.strftime('%b %Y')}"
-
-    # 1 Year Range
-    one_year_range = f"{(latest_month - pd.DateOffset(years=1)).strftime('%b %Y')} - {latest_month.strftime('%b %Y')}"
+    cube = dataset.cube
+
+    # Charts, rendered client-side, and the Canada and per province/territory rows of the
+    # Sales Summary table, with the date ranges for the column tooltips
+    panels = dashboard_panels(cube, ('sales_over_time', 'best_sellers', 'province_table', 'province_chart'))
 
     # -------------------------- Pass All Necessary Data to Template -------------------------- #
-    return render_template(
-        'index.html',
-        graph=graph_html,
-        best_selling_cars_graph=bar_graph_html,
-        table_data=table_data,
-        last_6_months_labels=last_6_months_labels,
-        total_last_6_months_range=total_last_6_months_range,
-        ytd_range=ytd_range,
-        one_year_range=one_year_range,
-        vehicle_types=vehicle_types 
-    )
-
-@app.route('/update_graph', methods=['POST'])
+    with stage('render'):
+        return render_template(
+            'index.html',
+            graph=panels['sales_over_time'],
+            best_selling_cars_graph=panels['best_sellers'],
+            province_graph=panels['province_chart'],
+            vehicle_types=['All'] + cube.vehicle_types,
+            **panels['province_table']
+        )
+
+@app.route('/update_graph', methods=['GET', 'POST'])
+@cached('vehicle_type')
 def update_graph():
-    data = request.get_json()
-    selected_vehicle_type = data.get('vehicle_type')
+    from data_loader import get_dataset
+
+    selected_vehicle_type = filter_param('vehicle_type')
 
     # Filter data based on selected vehicle type
-    filtered_df = df
-    title = 'Total Sales Over Time'
-    if selected_vehicle_type != 'All':
-        filtered_df = df[df['Vehicle Type'] == selected_vehicle_type]
-        title = f'Total Sales Over Time for {selected_vehicle_type}'
-
-    # Generate updated graph
-    sales_over_time = filtered_df.groupby('Month and Year')['Number of Cars'].sum().reset_index()
-    fig = px.line(
-        sales_over_time,
-        x='Month and Year',
-        y='Number of Cars',
-        title=f'{title}',
-        labels={'Number of Cars': 'Sales'},
-        template='plotly_white'
-    )
-    fig.update_traces(line=dict(width=2))
-    fig.update_layout(
-        xaxis_title='Month and Year',
-        yaxis_title='Number of Cars',
-        title_x=0.5
-    )
-    fig.update_traces(hovertemplate='%{x|%b %Y}<br>Sales: %{y}')
-
-    # Convert the Plotly figure to HTML
-    graph_html = fig.to_html(full_html=False, config={'displayModeBar': False, 'responsive': True})
-
-    # Best Selling Cars Bar Chart
-    latest_month = filtered_df['Month and Year'].max()
-    latest_month_data = filtered_df[filtered_df['Month and Year'] == latest_month]
-    best_selling_cars = (
-        latest_month_data.groupby(['Vehicle Make', 'Vehicle Model'])['Number of Cars']
-        .sum()
-        .nlargest(10)
-        .reset_index()
-    )
-
-    if best_selling_cars.empty:
-        bar_graph_html = '<p>No best selling cars data available for the latest month.</p>'
-    else:
-        # Combine Vehicle Make and Model for display
-        best_selling_cars['Make and Model'] = best_selling_cars['Vehicle Make'] + ' ' + best_selling_cars['Vehicle Model']
-        # Extract the actual month name
-        latest_month_str = latest_month.strftime('%B %Y')
-        bar_fig = px.bar(
-            best_selling_cars,
-            x='Make and Model',
-            y='Number of Cars',
-            title=f'Best Selling Cars in {latest_month_str}',
-            labels={'Number of Cars': 'Sales'},
-            template='plotly_white'
+    try:
+        panels = dashboard_panels(
+            get_dataset().cube, ('sales_over_time', 'best_sellers', 'province_table'), selected_vehicle_type,
         )
-        bar_fig.update_layout(
-            xaxis_title='Car Model',
-            yaxis_title='Number of Cars',
-            title_x=0.5
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with stage('serialize'):
+        return jsonify({
+            'graph': panels['sales_over_time'],
+            'best_selling_cars_graph': panels['best_sellers'],
+            **panels['province_table']
+        })
+
+@app.route('/get_province_sales_data', methods=['GET', 'POST'])
+@cached('vehicle_type')
+def get_province_sales_data():
+    from data_loader import get_dataset
+
+    selected_vehicle_type = filter_param('vehicle_type')
+    try:
+        panels = dashboard_panels(get_dataset().cube, ('province_chart',), selected_vehicle_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with stage('serialize'):
+        return jsonify({
+            'province_graph': panels['province_chart']
+        })
+
+@app.route('/panels', methods=['GET', 'POST'])
+@cached('vehicle_type', 'province', 'panels', multi=('panels',))
+def batch_panels():
+    """
+    Return several dashboard panels for one set of filters in one response,
+    e.g. /panels?vehicle_type=BEV&panels=sales_over_time,province_chart.
+
+    panels can be repeated or comma separated, every panel is returned when
+    it is missing. See dashboard_panels() for the panels and filters.
+    """
+    from data_loader import get_dataset
+
+    names = [
+        name.strip()
+        for value in filter_values('panels') if value != 'All'
+        for name in value.split(',') if name.strip()
+    ]
+    try:
+        data = dashboard_panels(
+            get_dataset().cube, names or PANELS, filter_param('vehicle_type'), filter_param('province'),
         )
-        bar_graph_html = bar_fig.to_html(full_html=False, config={'displayModeBar': False, 'responsive': True})
-
-    # Update table data
-    latest_month = filtered_df['Month and Year'].max()
-    last_6_months = filtered_df['Month and Year'].sort_values().drop_duplicates().iloc[-6:]
-    last_6_months = last_6_months[::-1]
-
-    last_6_months_labels = [month.strftime('%b %Y') for month in last_6_months]
-
-    ytd_start = pd.Timestamp(year=latest_month.year, month=1, day=1)
-    one_year_ago = latest_month - pd.DateOffset(years=1) + pd.DateOffset(days=1)
-
-    total_last_6_months = filtered_df[filtered_df['Month and Year'].isin(last_6_months)]['Number of Cars'].sum()
-    ytd_sales = filtered_df[(filtered_df['Month and Year'] >= ytd_start) & (filtered_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-    one_year_sales = filtered_df[(filtered_df['Month and Year'] >= one_year_ago) & (filtered_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-    canada_sales = filtered_df[filtered_df['Month and Year'].isin(last_6_months)].groupby('Month and Year')['Number of Cars'].sum().reindex(last_6_months).fillna(0)
-    total_canada_last_6 = canada_sales.sum()
-    canada_ytd = filtered_df[(filtered_df['Month and Year'] >= ytd_start) & (filtered_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-    canada_one_year = filtered_df[(filtered_df['Month and Year'] >= one_year_ago) & (filtered_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-    latest_month_sales_per_province = filtered_df[filtered_df['Month and Year'] == latest_month].groupby('Province/Territory')['Number of Cars'].sum()
-    sorted_provinces = latest_month_sales_per_province.sort_values(ascending=False).index.tolist()
-
-    table_data = []
-
-    canada_row = {
-        'Priority': 0,
-        'Province': 'Canada',
-        'Last 6 Months': [int(canada_sales[month]) for month in last_6_months],
-        'Total Last 6 Months': int(total_canada_last_6),
-        'YTD': int(canada_ytd),
-        '1 Year': int(canada_one_year)
-    }
-    table_data.append(canada_row)
-
-    for province in sorted_provinces:
-        province_df = filtered_df[filtered_df['Province/Territory'] == province]
-        province_sales_last_6 = province_df[province_df['Month and Year'].isin(last_6_months)].groupby('Month and Year')['Number of Cars'].sum().reindex(last_6_months).fillna(0)
-        total_province_last_6 = province_sales_last_6.sum()
-        province_ytd = province_df[(province_df['Month and Year'] >= ytd_start) & (province_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-        province_one_year = province_df[(province_df['Month and Year'] >= one_year_ago) & (province_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
-
-        province_row = {
-            'Priority': 1,
-            'Province': province,
-            'Last 6 Months': [int(sales) for sales in province_sales_last_6],
-            'Total Last 6 Months': int(total_province_last_6),
-            'YTD': int(province_ytd),
-            '1 Year': int(province_one_year)
-        }
-
-        table_data.append(province_row)
-
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with stage('serialize'):
+        return jsonify({
+            'vehicle_type': filter_param('vehicle_type'),
+            'province': filter_param('province'),
+            'panels': data
+        })
+
+@app.route('/healthz')
+def healthz():
+    # Liveness: the process serves requests, whether or not the data is loaded yet
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    # Readiness: the dataset is loaded and the data routes answer without waiting
+    state = readiness()
+    return jsonify(state), 200 if state['ready'] else 503
+
+@app.route('/status')
+def status():
+    from data_loader import get_dataset, month_label
+
+    dataset = get_dataset()
+    cube = dataset.cube
     return jsonify({
-        'graph_html': graph_html,
-        'best_selling_cars_graph': bar_graph_html,
-        'table_data': table_data,
-        'last_6_months_labels': last_6_months_labels,
-        'total_last_6_months_range': f"{last_6_months.iloc[-1].strftime('%b %Y')} - {last_6_months.iloc[0].strftime('%b %Y')}",
-        'ytd_range': f"{ytd_start.strftime('%b %Y')} - {latest_month.strftime('%b %Y')}",
-        'one_year_range': f"{(latest_month - pd.DateOffset(years=1)).strftime('%b %Y')} - {latest_month.strftime('%b %Y')}"
+        'version': dataset.version,
+        'modified': dataset.modified.isoformat() if dataset.modified else None,
+        'loaded_at': dataset.loaded_at.isoformat(),
+        'rows': len(dataset.df),
+        'months': [month_label(cube.months[0]), month_label(cube.latest_month)] if len(cube.months) else [],
+        'response_cache': response_cache.stats()
     })
 
-@app.route('/get_province_sales_data', methods=['POST'])
-def get_province_sales_data():
-    data = request.get_json()
-    selected_vehicle_type = data.get('vehicle_type', 'All')
-
-    # Set date range to include all data
-    end_date = df['Month and Year'].max()
-    start_date = end_date - pd.DateOffset(years=10)  # Adjust as needed for historical data span
-
-    # Filter data based on vehicle type only
-    filtered_df = df.copy()
-    if selected_vehicle_type != 'All':
-        filtered_df = filtered_df[filtered_df['Vehicle Type'] == selected_vehicle_type]
-    
-    # Group data by 'Month and Year' and 'Province/Territory'
-    province_time_sales = filtered_df.groupby(['Month and Year', 'Province/Territory'])['Number of Cars'].sum().reset_index()
-
-    # Pivot the data to have 'Month and Year' as x-axis and provinces as lines
-    pivot_df = province_time_sales.pivot(index='Month and Year', columns='Province/Territory', values='Number of Cars').fillna(0)
-
-    # Determine the top 4 provinces based on the most recent month's sales
-    latest_month = pivot_df.index.max()
-    top_provinces = pivot_df.loc[latest_month].sort_values(ascending=False).nlargest(4).index.tolist()
-    
-    # **New Code Starts Here**
-    # Sort all provinces based on sales in the latest month
-    sorted_provinces = pivot_df.loc[latest_month].sort_values(ascending=False).index.tolist()
-    
-    # Reorder pivot_df columns based on sorted_provinces
-    pivot_df = pivot_df[sorted_provinces]
-    # **New Code Ends Here**
-
-    # Create the Plotly line chart with all provinces
-    fig = px.line(
-        pivot_df,
-        x=pivot_df.index,
-        y=pivot_df.columns,
-        title='Sales by Province/Territory Over Time',
-        labels={'value': 'Number of Cars', 'Month and Year': 'Date'},
-        template='plotly_white'
-    )
-    fig.update_layout(
-        xaxis_title='Month and Year',
-        yaxis_title='Number of Cars',
-        legend_title_text='Province/Territory',
-        title_x=0.5,
-        xaxis=dict(
-            range=[end_date - pd.DateOffset(years=1), end_date],  # Default to past year
-            rangeselector=dict(
-                buttons=list([
-                    dict(count=1, label="1y", step="year", stepmode="backward"),
-                    dict(count=2, label="2y", step="year", stepmode="backward"),
-                    dict(step="all")
-                ])
-            ),
-            rangeslider=dict(visible=True),
-            type="date"
-        )
-    )
-
-    # Set visibility: top 4 provinces visible, others legendonly
-    for trace in fig.data:
-        if trace.name not in top_provinces:
-            trace.visible = 'legendonly'
-        # **New Code Starts Here**
-        # Update hover template to include Province/Territory name
-        trace.hovertemplate = '%{fullData.name}<br>%{x|%b %Y}<br>Cars Sold: %{y}<extra></extra>'
-        # **New Code Ends Here**
-
-    # Enable panning and zooming
-    fig.update_xaxes(rangeslider_visible=True)
+@app.cli.command('ingest')
+@click.argument('delta_path', type=click.Path(exists=True, dir_okay=False))
+def ingest(delta_path):
+    """Append the rows of DELTA_PATH, e.g. a new month of data, to the data file."""
+    from data_loader import get_dataset, ingest_file
 
-    # Convert the figure to HTML
-    province_graph_html = fig.to_html(full_html=False, config={'displayModeBar': False, 'responsive': True})
+    rows = ingest_file(delta_path)
+    click.echo(f"Ingested {rows} rows, dataset version {get_dataset().version}")
 
-    return jsonify({
-        'province_graph_html': province_graph_html
-    })
+@app.cli.command('prerender')
+@click.option('--output', default=PRERENDER_DIR, show_default=True, help='Artifact directory.')
+def prerender(output):
+    """Render every page and AJAX payload, for every filter combination, to gzip-compressed files."""
+    manifest = build_artifacts(app, output)
+    size = sum(os.path.getsize(os.path.join(output, manifest['version'], entry['file'])) for entry in manifest['entries'].values())
+    click.echo(f"Prerendered {len(manifest['entries'])} responses ({size / 1e6:.1f} MB) for dataset version {manifest['version']} in {output}")
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1,87 @@
+# benchmarks/bench_boot.py
+#
+# Measure how soon a fresh worker answers: time to import the app, to the
+# first /healthz response, to /readyz reporting ready and to the first page,
+# plus the slowest imports reported by `python -X importtime`.
+#
+#     python -m benchmarks.bench_boot [--repeat 5] [--top 10]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Run in a fresh interpreter, times are in seconds since the interpreter started importing the app
+WORKER = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+assert client.get('/healthz').status_code == 200
+healthy = time.perf_counter()
+while client.get('/readyz').status_code != 200:
+    time.sleep(0.005)
+ready = time.perf_counter()
+assert client.get('/').status_code == 200
+page = time.perf_counter()
+print(json.dumps({name: t - start for name, t in
+                  [('import', imported), ('healthz', healthy), ('ready', ready), ('first page', page)]}))
+'''
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def boot():
+    """Start the app in a new process, returning its milestone times."""
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER], cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def import_times(code):
+    """
+    Return the cumulative import time of every module imported by running `code`.
+
+    Returns:
+        list: (seconds, module) tuples, slowest first.
+    """
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    ).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(times, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark time to first response of a new worker.')
+    parser.add_argument('--repeat', type=int, default=5, help='Worker starts, the median is reported')
+    parser.add_argument('--top', type=int, default=10, help='Slowest imports to list')
+    args = parser.parse_args()
+
+    runs = [boot() for _ in range(args.repeat)]
+    for milestone in runs[0]:
+        print(f'{milestone:>12}: {statistics.median(run[milestone] for run in runs) * 1000:8.1f} ms')
+
+    # Imports done before the first request can be answered. The warm-up thread is
+    # left out, its imports would otherwise be interleaved with the app's.
+    print(f'\nSlowest imports of the app (cumulative, -X importtime):')
+    for seconds, name in import_times('import warmup; warmup.start_warm_up = lambda: None; import app')[:args.top]:
+        print(f'{seconds * 1000:8.1f} ms  {name}')
+
+    print(f'\nSlowest imports of the warm-up:')
+    for seconds, name in import_times('import warmup; warmup.warm_up()')[:args.top]:
+        print(f'{seconds * 1000:8.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
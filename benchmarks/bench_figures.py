@@ -0,0 +1,171 @@
+# benchmarks/bench_figures.py
+#
+# Compare the plotly.express charts the dashboard used to build with the figure
+# specs of figures.py: check that both give the same figure JSON for every
+# vehicle type, then time building and serializing each on a synthetic dataset.
+#
+#     python -m benchmarks.bench_figures [--scale 1] [--repeat 5]
+
+import argparse
+import base64
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from app import app, best_selling_cars, dashboard_panels
+from benchmarks.synthetic import synthetic_frame
+from benchmarks.timing import best_of
+from charts import compact_figure, orjson
+from data_loader import month_label, month_start
+from sales_cube import SalesCube
+
+
+def figure_json(fig):
+    """Convert a Plotly figure to the compacted data/layout dict the dashboard used to send."""
+    return compact_figure(json.loads(fig.to_json(validate=False, remove_uids=True)))
+
+
+def legacy_sales_charts(cube, vehicle_type='All'):
+    """The plotly.express line and bar charts previously built by index() and update_graph()."""
+    title = 'Total Sales Over Time'
+    if vehicle_type != 'All':
+        title = f'Total Sales Over Time for {vehicle_type}'
+    monthly_sales = cube.sum(by=('month',), vehicle_type=vehicle_type)
+    present = monthly_sales > 0
+    sales_over_time = pd.DataFrame({
+        'Month and Year': [month_start(code) for code in cube.months[present]],
+        'Number of Cars': monthly_sales[present],
+    })
+    fig = px.line(
+        sales_over_time,
+        x='Month and Year',
+        y='Number of Cars',
+        title=f'{title}',
+        labels={'Number of Cars': 'Sales'},
+        template='plotly_white'
+    )
+    fig.update_traces(line=dict(width=2))
+    fig.update_layout(xaxis_title='Month and Year', yaxis_title='Number of Cars', title_x=0.5)
+    fig.update_traces(hovertemplate='%{x|%b %Y}<br>Sales: %{y}')
+
+    present_months = cube.months[present]
+    latest_month = int(present_months[-1]) if len(present_months) else cube.latest_month
+    names, sales = best_selling_cars(cube, latest_month, vehicle_type)
+    if not names:
+        return figure_json(fig), None
+    bar_fig = px.bar(
+        pd.DataFrame({'Make and Model': names, 'Number of Cars': sales}),
+        x='Make and Model',
+        y='Number of Cars',
+        title=f'Best Selling Cars in {month_label(latest_month, "%B %Y")}',
+        labels={'Number of Cars': 'Sales'},
+        template='plotly_white'
+    )
+    bar_fig.update_layout(xaxis_title='Car Model', yaxis_title='Number of Cars', title_x=0.5)
+    return figure_json(fig), figure_json(bar_fig)
+
+
+def legacy_province_figure(cube, vehicle_type='All'):
+    """The plotly.express chart previously built by get_province_sales_data()."""
+    end_date = month_start(cube.latest_month)
+    province_time_sales = cube.sum(by=('month', 'province'), vehicle_type=vehicle_type)
+    months_with_sales = province_time_sales.sum(axis=1) > 0
+    provinces_with_sales = province_time_sales.sum(axis=0) > 0
+    pivot_df = pd.DataFrame(
+        province_time_sales[np.ix_(months_with_sales, provinces_with_sales)],
+        index=pd.DatetimeIndex([month_start(code) for code in cube.months[months_with_sales]], name='Month and Year'),
+        columns=pd.Index([name for name, keep in zip(cube.provinces, provinces_with_sales) if keep], name='Province/Territory'),
+    )
+    # Ties are ordered alphabetically (stable sort), as figures.py orders them
+    latest_month = pivot_df.index.max()
+    top_provinces = pivot_df.loc[latest_month].sort_values(ascending=False, kind='stable').nlargest(4).index.tolist()
+    pivot_df = pivot_df[pivot_df.loc[latest_month].sort_values(ascending=False, kind='stable').index.tolist()]
+
+    fig = px.line(
+        pivot_df,
+        x=pivot_df.index,
+        y=pivot_df.columns,
+        title='Sales by Province/Territory Over Time',
+        labels={'value': 'Number of Cars', 'Month and Year': 'Date'},
+        template='plotly_white'
+    )
+    fig.update_layout(
+        xaxis_title='Month and Year',
+        yaxis_title='Number of Cars',
+        legend_title_text='Province/Territory',
+        title_x=0.5,
+        xaxis=dict(
+            range=[end_date - pd.DateOffset(years=1), end_date],
+            rangeselector=dict(buttons=list([
+                dict(count=1, label="1y", step="year", stepmode="backward"),
+                dict(count=2, label="2y", step="year", stepmode="backward"),
+                dict(step="all")
+            ])),
+            rangeslider=dict(visible=True),
+            type="date"
+        )
+    )
+    for trace in fig.data:
+        if trace.name not in top_provinces:
+            trace.visible = 'legendonly'
+        trace.hovertemplate = '%{fullData.name}<br>%{x|%b %Y}<br>Cars Sold: %{y}<extra></extra>'
+    fig.update_xaxes(rangeslider_visible=True)
+    return figure_json(fig)
+
+
+def sales_charts(cube, vehicle_type='All'):
+    """The figures.py line and bar charts, as index() and update_graph() build them."""
+    panels = dashboard_panels(cube, ('sales_over_time', 'best_sellers'), vehicle_type)
+    return panels['sales_over_time'], panels['best_sellers']
+
+
+def province_chart(cube, vehicle_type='All'):
+    """The figures.py province chart, as get_province_sales_data() builds it."""
+    return dashboard_panels(cube, ('province_chart',), vehicle_type)['province_chart']
+
+
+def decode_typed_arrays(value):
+    """Replace plotly.js typed arrays by lists, so specs compare by value whatever the encoding dtype."""
+    if isinstance(value, dict):
+        if set(value) == {'dtype', 'bdata'}:
+            return np.frombuffer(base64.b64decode(value['bdata']), dtype=value['dtype']).tolist()
+        return {key: decode_typed_arrays(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_typed_arrays(item) for item in value]
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark plotly.express charts against figures.py specs.')
+    parser.add_argument('--scale', type=int, default=1, help='Size of the synthetic dataset, in copies of car_summary.csv')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, the fastest is reported')
+    args = parser.parse_args()
+
+    cube = SalesCube(synthetic_frame(args.scale))
+    charts = [
+        ('sales charts', legacy_sales_charts, sales_charts),
+        ('province chart', legacy_province_figure, province_chart),
+    ]
+
+    with app.app_context():
+        for vehicle_type in ['All'] + cube.vehicle_types:
+            for name, legacy, spec in charts:
+                expected = decode_typed_arrays(legacy(cube, vehicle_type))
+                assert decode_typed_arrays(spec(cube, vehicle_type)) == expected, f'{name} differ for {vehicle_type}'
+
+                def serialized(builder):
+                    return lambda: app.json.dumps(builder(cube, vehicle_type))
+
+                legacy_time = best_of(args.repeat, serialized(legacy))
+                spec_time = best_of(args.repeat, serialized(spec))
+                print(
+                    f'{vehicle_type:>5} {name:<15}: plotly.express {legacy_time * 1000:8.1f} ms, '
+                    f'figure spec {spec_time * 1000:6.2f} ms ({legacy_time / spec_time:,.0f}x), same figure JSON'
+                )
+    print(f'JSON encoded with {"orjson" if orjson is not None else "json"}')
+
+
+if __name__ == '__main__':
+    main()
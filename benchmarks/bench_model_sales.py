@@ -0,0 +1,71 @@
+# benchmarks/bench_model_sales.py
+#
+# Compare masking the whole frame by make and model, as brand_sales() used to
+# do by make, with model_sales_data() reading the model's slice of the
+# ModelIndex: check that both give the same monthly sales for every model,
+# then time both on a synthetic dataset.
+#
+#     python -m benchmarks.bench_model_sales [--scale 100] [--repeat 5] [--models 20]
+
+import argparse
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_frame
+from benchmarks.timing import best_of
+from data_loader import Dataset, parse_month
+from model_sales import model_sales_data
+
+
+def legacy_model_sales(df, make, model):
+    """Monthly sales by province and by vehicle type of one model, masking and grouping the whole frame."""
+    model_df = df[(df['Vehicle Make'] == make) & (df['Vehicle Model'] == model)]
+    by_province = model_df.groupby(['Month', 'Province/Territory'], observed=True)['Number of Cars'].sum()
+    by_type = model_df.groupby(['Month', 'Vehicle Type'], observed=True)['Number of Cars'].sum()
+    return by_province, by_type
+
+
+def nonzero_sales(data, names_key, sales_key):
+    """Return {(month code, name): sales} of the non-zero cells of a model_sales_data() breakdown."""
+    months = [parse_month(month) for month in data['months']]
+    return {
+        (month, name): sales
+        for name, monthly in zip(data[names_key], data[sales_key])
+        for month, sales in zip(months, monthly) if sales
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-model sales lookups.')
+    parser.add_argument('--scale', type=int, default=100, help='Size of the synthetic dataset, in copies of car_summary.csv')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, the fastest is reported')
+    parser.add_argument('--models', type=int, default=20, help='Models checked and timed, best sellers first')
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.scale)
+    dataset = Dataset(df)
+    print(f'{len(df):,} rows, {len(dataset.models)} models')
+
+    cube = dataset.cube
+    best_sellers = np.argsort(-cube.sum(by=('vehicle',)), kind='stable')[:args.models]
+    legacy_total = index_total = 0.0
+    for make, model in cube.vehicle_names(best_sellers):
+        by_province, by_type = legacy_model_sales(df, make, model)
+        data = model_sales_data(dataset.models, make, model)
+        for legacy, names_key, sales_key in ((by_province, 'provinces', 'by_province'), (by_type, 'vehicle_types', 'by_type')):
+            expected = {(int(month), str(name)): int(sales) for (month, name), sales in legacy.items() if sales}
+            assert nonzero_sales(data, names_key, sales_key) == expected, f'{sales_key} differs for {make} {model}'
+
+        legacy_time = best_of(args.repeat, legacy_model_sales, df, make, model)
+        index_time = best_of(args.repeat, model_sales_data, dataset.models, make, model)
+        legacy_total += legacy_time
+        index_total += index_time
+        print(
+            f'{make + " " + model:<30}: frame mask {legacy_time * 1000:8.2f} ms, '
+            f'model index {index_time * 1000:6.3f} ms ({legacy_time / index_time:,.0f}x), same sales'
+        )
+    print(f'{"Total":<30}: frame mask {legacy_total * 1000:8.2f} ms, model index {index_total * 1000:6.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
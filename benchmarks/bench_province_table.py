@@ -0,0 +1,93 @@
+# benchmarks/bench_province_table.py
+#
+# Compare the per-province loop that used to build the home page Sales Summary
+# table with sales_tables.province_sales_table on a synthetic dataset.
+#
+#     python -m benchmarks.bench_province_table [--scale 100] [--repeat 5]
+
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_frame
+from benchmarks.timing import best_of
+from sales_cube import SalesCube
+from sales_tables import province_sales_table
+
+
+def legacy_province_table(df, vehicle_type='All'):
+    """The table builder previously inlined in index() and update_graph(): one set of masks per province."""
+    filtered_df = df
+    if vehicle_type != 'All':
+        filtered_df = df[df['Vehicle Type'] == vehicle_type]
+
+    latest_month = filtered_df['Month and Year'].max()
+    last_6_months = filtered_df['Month and Year'].sort_values().drop_duplicates().iloc[-6:]
+    last_6_months = last_6_months[::-1]
+
+    ytd_start = pd.Timestamp(year=latest_month.year, month=1, day=1)
+    one_year_ago = latest_month - pd.DateOffset(years=1) + pd.DateOffset(days=1)
+
+    canada_sales = filtered_df[filtered_df['Month and Year'].isin(last_6_months)].groupby('Month and Year')['Number of Cars'].sum().reindex(last_6_months).fillna(0)
+    canada_ytd = filtered_df[(filtered_df['Month and Year'] >= ytd_start) & (filtered_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
+    canada_one_year = filtered_df[(filtered_df['Month and Year'] >= one_year_ago) & (filtered_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
+
+    latest_month_sales_per_province = filtered_df[filtered_df['Month and Year'] == latest_month].groupby('Province/Territory', observed=True)['Number of Cars'].sum()
+    sorted_provinces = latest_month_sales_per_province.sort_values(ascending=False, kind='stable').index.tolist()
+
+    table_data = [{
+        'Priority': 0,
+        'Province': 'Canada',
+        'Last 6 Months': [int(canada_sales[month]) for month in last_6_months],
+        'Total Last 6 Months': int(canada_sales.sum()),
+        'YTD': int(canada_ytd),
+        '1 Year': int(canada_one_year)
+    }]
+    for province in sorted_provinces:
+        province_df = filtered_df[filtered_df['Province/Territory'] == province]
+        province_sales_last_6 = province_df[province_df['Month and Year'].isin(last_6_months)].groupby('Month and Year')['Number of Cars'].sum().reindex(last_6_months).fillna(0)
+        province_ytd = province_df[(province_df['Month and Year'] >= ytd_start) & (province_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
+        province_one_year = province_df[(province_df['Month and Year'] >= one_year_ago) & (province_df['Month and Year'] <= latest_month)]['Number of Cars'].sum()
+        table_data.append({
+            'Priority': 1,
+            'Province': province,
+            'Last 6 Months': [int(sales) for sales in province_sales_last_6],
+            'Total Last 6 Months': int(province_sales_last_6.sum()),
+            'YTD': int(province_ytd),
+            '1 Year': int(province_one_year)
+        })
+    return table_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Sales Summary table builders.')
+    parser.add_argument('--scale', type=int, default=100, help='Size of the synthetic dataset, in copies of car_summary.csv')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement, the fastest is reported')
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.scale)
+    start = time.perf_counter()
+    cube = SalesCube(df)
+    build_time = time.perf_counter() - start
+    print(f'{len(df):,} rows, cube built once at load time in {build_time * 1000:.1f} ms')
+
+    for vehicle_type in ['All'] + cube.vehicle_types:
+        legacy = legacy_province_table(df, vehicle_type)
+        # The legacy table has no rolling averages, growth or share columns
+        vectorized = [
+            {key: row[key] for key in legacy_row}
+            for row, legacy_row in zip(province_sales_table(cube, vehicle_type)['table_data'], legacy)
+        ]
+        assert legacy == vectorized, f'Tables differ for {vehicle_type}'
+
+        legacy_time = best_of(args.repeat, legacy_province_table, df, vehicle_type)
+        vectorized_time = best_of(args.repeat, province_sales_table, cube, vehicle_type)
+        print(
+            f'{vehicle_type:>5}: per-province loop {legacy_time * 1000:9.1f} ms, '
+            f'pivot {vectorized_time * 1000:7.2f} ms ({legacy_time / vectorized_time:,.0f}x)'
+        )
+
+
+if __name__ == '__main__':
+    main()
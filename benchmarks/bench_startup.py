@@ -0,0 +1,63 @@
+# benchmarks/bench_startup.py
+#
+# Measure cold start of a worker loading the dataset, parsing the CSV versus
+# reading the columnar cache, each in a fresh interpreter.
+#
+#     python -m benchmarks.bench_startup [--scales 1 10 100] [--repeat 3]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import synthetic_frame, write_csv
+
+# Run in a fresh interpreter: time the imports and load_dataset() separately
+WORKER = '''
+import json, sys, time
+start = time.perf_counter()
+import data_loader
+imported = time.perf_counter()
+dataset = data_loader.load_dataset(sys.argv[1], use_cache=sys.argv[2] == 'cache')
+loaded = time.perf_counter()
+print(json.dumps({'import': imported - start, 'load': loaded - imported, 'rows': len(dataset.df)}))
+'''
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def cold_start(path, mode):
+    """Load `path` in a new process, returning its import and load times."""
+    output = subprocess.run(
+        [sys.executable, '-c', WORKER, path, mode],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dataset cold start from CSV and from the columnar cache.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100], help='Dataset sizes, in copies of car_summary.csv')
+    parser.add_argument('--repeat', type=int, default=3, help='Cold starts per measurement, the fastest is reported')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            path = os.path.join(directory, f'car_summary_{scale}x.csv')
+            write_csv(synthetic_frame(scale), path)
+
+            # The first cached start parses the CSV and writes the cache
+            cold_start(path, 'cache')
+            csv = min((cold_start(path, 'csv') for _ in range(args.repeat)), key=lambda run: run['load'])
+            cache = min((cold_start(path, 'cache') for _ in range(args.repeat)), key=lambda run: run['load'])
+            print(
+                f'{scale:>4}x ({csv["rows"]:,} rows, {os.path.getsize(path) / 1e6:.1f} MB): '
+                f'CSV {csv["load"] * 1000:8.1f} ms, cache {cache["load"] * 1000:8.1f} ms '
+                f'({csv["load"] / cache["load"]:.1f}x), imports {cache["import"] * 1000:.0f} ms'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_wire_bytes.py
+#
+# Report the bytes sent for each dashboard route, per Accept-Encoding of the
+# client, and the time to render and compress each response on a cache miss.
+#
+#     python -m benchmarks.bench_wire_bytes [--json report.json]
+
+import argparse
+import json
+import time
+
+ROUTES = [
+    '/',
+    '/update_graph?vehicle_type=BEV',
+    '/get_province_sales_data',
+    '/brand_sales',
+    '/brand_sales?vehicle_type=PHEV&province=Quebec',
+    '/brand_sales/data',
+    '/api/sales?group_by=make,month',
+]
+
+ACCEPT_ENCODINGS = ['identity', 'gzip', 'gzip, deflate, br']
+
+
+def measure(client, url):
+    """Return the miss time in ms and the bytes on the wire per Accept-Encoding of `url`."""
+    from response_cache import response_cache
+
+    response_cache.clear()
+    start = time.perf_counter()
+    client.get(url)
+    miss = (time.perf_counter() - start) * 1000
+
+    sizes = {}
+    for accept in ACCEPT_ENCODINGS:
+        response = client.get(url, headers={'Accept-Encoding': accept})
+        assert response.status_code == 200, f'{url} returned {response.status_code}'
+        sizes[accept] = (response.headers.get('Content-Encoding', 'identity'), len(response.get_data()))
+    return miss, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report bytes on the wire per route and Accept-Encoding.')
+    parser.add_argument('--json', help='Also write the results to this file')
+    args = parser.parse_args()
+
+    from app import app
+    from charts import plotly_js_url
+    from warmup import wait_until_ready
+
+    wait_until_ready()
+    # Measure responses rendered by this tree, not prerendered artifacts
+    app.config['PRERENDERED'] = False
+    client = app.test_client()
+    with app.test_request_context():
+        # The content-hashed plotly.js bundle every page loads
+        routes = ROUTES + [plotly_js_url()]
+
+    results = {}
+    print(f"{'route':<48} {'miss ms':>8}  " + '  '.join(f'{accept:>22}' for accept in ACCEPT_ENCODINGS))
+    for url in routes:
+        miss, sizes = measure(client, url)
+        results[url] = {'miss_ms': round(miss, 1), 'bytes': {accept: size for accept, (_, size) in sizes.items()}}
+        cells = '  '.join(f'{f"{size:,} ({encoding})":>22}' for encoding, size in sizes.values())
+        print(f'{url:<48} {miss:8.1f}  {cells}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
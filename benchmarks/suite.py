@@ -0,0 +1,353 @@
+# benchmarks/suite.py
+#
+# Benchmark and load-test suite. For each dataset scale, a synthetic copy of
+# car_summary.csv is generated and, in a fresh interpreter:
+#   - load_data() and load_dataset() are timed, from the CSV and from the columnar cache,
+#   - every route is requested through the Flask test client with every filter
+#     combination, uncached and cached, recording time, bytes and Server-Timing stages,
+#   - peak memory (max RSS) is recorded.
+# A local server is then started on the dataset and loaded by concurrent clients.
+# Results are written to a JSON report, which can be compared with an earlier one.
+#
+#     python -m benchmarks.suite [--scales 1 10 100 1000] [--repeat 3] [--concurrency 8] [--duration 10]
+#                                [--output benchmark-report.json] [--compare previous-report.json]
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import write_synthetic_csv
+from prerender import HOME_PAGE_PANELS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Serves the app on a free local port, printing the port once the dataset is loaded
+SERVER = '''
+from werkzeug.serving import make_server
+import app, warmup
+warmup.wait_until_ready()
+server = make_server('127.0.0.1', 0, app.app, threaded=True)
+print(server.server_port, flush=True)
+server.serve_forever()
+'''
+
+
+def route_cases(cube):
+    """
+    Return every (path, params) request measured, covering every route and filter combination.
+
+    Args:
+        cube (SalesCube): Aggregated sales, for the filter values.
+
+    Returns:
+        list: (path, dict of query parameters) tuples.
+    """
+    vehicle_types = ['All'] + cube.vehicle_types
+    provinces = ['All'] + cube.provinces
+    latest = cube.latest_month
+    last_year = f'{(latest - 11) // 12}-{(latest - 11) % 12 + 1:02d}'
+
+    cases = [('/', {})]
+    cases += [('/update_graph', {'vehicle_type': t}) for t in vehicle_types]
+    cases += [('/get_province_sales_data', {'vehicle_type': t}) for t in vehicle_types]
+    # What the home page requests when the vehicle type changes
+    cases += [('/panels', {'vehicle_type': t, 'panels': HOME_PAGE_PANELS}) for t in vehicle_types]
+    for path in ('/brand_sales', '/brand_sales/data'):
+        cases += [(path, {'vehicle_type': t, 'province': p}) for t in vehicle_types for p in provinces]
+    cases += [
+        ('/api/sales', {}),
+        ('/api/sales', {'group_by': 'make'}),
+        ('/api/sales', {'group_by': 'model', 'top': '10'}),
+        ('/api/sales', {'group_by': 'month,province'}),
+        ('/api/sales', {'group_by': 'make,month', 'vehicle_type': 'PHEV', 'start': last_year}),
+        ('/export.csv', {'vehicle_type': 'PHEV', 'province': 'Quebec', 'start': last_year}),
+        ('/export.ndjson', {'province': 'Yukon'}),
+    ]
+    # Pages of the best selling model, and a search for it as typed
+    make, model = cube.vehicle_names([int(cube.sum(by=('vehicle',)).argmax())])[0]
+    model_path = f'/model/{urllib.parse.quote(make, safe="")}/{urllib.parse.quote(model, safe="")}'
+    cases += [(model_path, {}), (f'{model_path}/data', {}), ('/api/search', {'q': model[:3]})]
+    return cases
+
+
+def _summary(values):
+    values = sorted(values)
+    return {
+        'median': statistics.median(values),
+        'p95': values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))],
+        'max': values[-1],
+    }
+
+
+def _stages(header):
+    """Parse a Server-Timing header into {stage: milliseconds}."""
+    stages = {}
+    for metric in filter(None, (part.strip() for part in (header or '').split(','))):
+        name, _, params = metric.partition(';')
+        if params.startswith('dur='):
+            stages[name] = float(params[len('dur='):])
+    return stages
+
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(path, repeat):
+    """
+    Time loading `path` and every route on it, in this (fresh) interpreter.
+
+    Returns:
+        dict: 'load' times in seconds, per route 'routes' summaries and peak memory in MB.
+    """
+    import data_loader
+
+    result = {'load': {}, 'memory_mb': {}}
+    start = time.perf_counter()
+    rows = len(data_loader.load_data(path))
+    result['load']['load_data'] = time.perf_counter() - start
+    result['memory_mb']['after_load_data'] = _max_rss_mb()
+
+    start = time.perf_counter()
+    data_loader.load_dataset(path, use_cache=False)
+    result['load']['load_dataset_csv'] = time.perf_counter() - start
+    data_loader.load_dataset(path)  # writes the columnar cache
+    start = time.perf_counter()
+    dataset = data_loader.load_dataset(path)
+    result['load']['load_dataset_cache'] = time.perf_counter() - start
+    result['rows'] = rows
+
+    # Serve the cached dataset, as a restarted worker would
+    data_loader._dataset = dataset
+    import app
+    from response_cache import response_cache
+    client = app.app.test_client()
+
+    routes = {}
+    result['cases'] = route_cases(dataset.cube)
+    for path_, params in result['cases']:
+        timings = []
+        for _ in range(repeat):
+            response_cache.clear()
+            start = time.perf_counter()
+            response = client.get(path_, query_string=params)
+            body = response.get_data()
+            timings.append((time.perf_counter() - start, _stages(response.headers.get('Server-Timing'))))
+            assert response.status_code == 200, (path_, params, response.status_code)
+        cold, stages = min(timings, key=lambda timing: timing[0])
+
+        start = time.perf_counter()
+        client.get(path_, query_string=params).get_data()
+        warm = time.perf_counter() - start
+
+        route = routes.setdefault(path_, {'cold_ms': [], 'warm_ms': [], 'bytes': [], 'stages_ms': {}})
+        route['cold_ms'].append(cold * 1000)
+        route['warm_ms'].append(warm * 1000)
+        route['bytes'].append(len(body))
+        for name, ms in stages.items():
+            if name != 'total':
+                route['stages_ms'].setdefault(name, []).append(ms)
+
+    result['routes'] = {
+        path_: {
+            'cases': len(route['cold_ms']),
+            'cold_ms': _summary(route['cold_ms']),
+            'warm_ms': _summary(route['warm_ms']),
+            'bytes': _summary(route['bytes']),
+            'stages_ms': {name: statistics.median(values) for name, values in route['stages_ms'].items()},
+        }
+        for path_, route in routes.items()
+    }
+    result['memory_mb']['peak'] = _max_rss_mb()
+    return result
+
+
+def measure(path, repeat):
+    """Run run_worker() on `path` in a new interpreter and return its result."""
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.suite', '--worker', path, '--repeat', str(repeat)],
+        cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+        env={**os.environ, 'IZEV_DATA_FILE': path},
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def load_test(path, cases, concurrency, duration):
+    """
+    Serve `path` from a local server and request `cases` from `concurrency` client threads.
+
+    Each client requests the cases in its own random order, over and over,
+    for `duration` seconds. Responses are cached by the server as in
+    production, so this measures a warm server.
+
+    Returns:
+        dict: Request count, throughput, latency percentiles in ms and errors.
+    """
+    server = subprocess.Popen(
+        [sys.executable, '-c', SERVER], cwd=REPO_ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, env={**os.environ, 'IZEV_DATA_FILE': path},
+    )
+    try:
+        port = int(server.stdout.readline())
+        urls = [
+            f'http://127.0.0.1:{port}{path_}?{urllib.parse.urlencode(params)}' for path_, params in cases
+        ]
+        latencies, errors = [], []
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client(seed):
+            order = urls[:]
+            random.Random(seed).shuffle(order)
+            while time.perf_counter() < deadline:
+                for url in order:
+                    start = time.perf_counter()
+                    try:
+                        with urllib.request.urlopen(url, timeout=60) as response:
+                            response.read()
+                    except (urllib.error.URLError, OSError) as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    with lock:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    if time.perf_counter() >= deadline:
+                        break
+
+        threads = [threading.Thread(target=client, args=(seed,)) for seed in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': len(latencies) / elapsed,
+        'latency_ms': {
+            name: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else None
+            for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+        },
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, check=True, capture_output=True, text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Print the main metrics of `report` next to those of `baseline`, with the ratio."""
+    def row(label, new, old):
+        ratio = f'{new / old:6.2f}x' if old else '     -'
+        print(f'  {label:<48} {old:12.2f} {new:12.2f} {ratio}')
+
+    for scale, new in report['scales'].items():
+        old = baseline['scales'].get(scale)
+        if old is None:
+            continue
+        print(f'{scale}x{"":<47} {"baseline":>12} {"current":>12}  ratio')
+        for name, seconds in new['load'].items():
+            if name in old['load']:
+                row(f'{name} (ms)', seconds * 1000, old['load'][name] * 1000)
+        for route, stats in new['routes'].items():
+            if route in old['routes']:
+                row(f'{route} median uncached (ms)', stats['cold_ms']['median'], old['routes'][route]['cold_ms']['median'])
+        row('peak memory (MB)', new['memory_mb']['peak'], old['memory_mb']['peak'])
+        if 'load_test' in new and 'load_test' in old:
+            row('load test requests/s', new['load_test']['requests_per_second'], old['load_test']['requests_per_second'])
+            row('load test p95 (ms)', new['load_test']['latency_ms']['p95'], old['load_test']['latency_ms']['p95'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark loading and every route on scaled synthetic datasets.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100, 1000], help='Dataset sizes, in copies of car_summary.csv')
+    parser.add_argument('--repeat', type=int, default=3, help='Uncached requests per case, the fastest is reported')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads of the load test, 0 to skip it')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds of load test per scale')
+    parser.add_argument('--output', default='benchmark-report.json', help='JSON report to write')
+    parser.add_argument('--compare', help='Earlier JSON report to compare with')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.repeat)))
+        return
+
+    report = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {name: value for name, value in vars(args).items() if name != 'worker'},
+        },
+        'scales': {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales:
+            path = os.path.join(directory, f'car_summary_{scale}x.csv')
+            start = time.perf_counter()
+            write_synthetic_csv(scale, path)
+            print(f'{scale}x: generated {os.path.getsize(path) / 1e6:.1f} MB in {time.perf_counter() - start:.1f} s', flush=True)
+
+            result = measure(path, args.repeat)
+            result['file_mb'] = os.path.getsize(path) / 1e6
+            print(
+                f'{scale}x: {result["rows"]:,} rows, load_data {result["load"]["load_data"]:.2f} s, '
+                f'from cache {result["load"]["load_dataset_cache"]:.2f} s, peak {result["memory_mb"]["peak"]:.0f} MB',
+                flush=True,
+            )
+            for route, stats in result['routes'].items():
+                print(
+                    f'    {route:<28} {stats["cases"]:>3} cases  uncached median {stats["cold_ms"]["median"]:8.2f} ms '
+                    f'(p95 {stats["cold_ms"]["p95"]:8.2f})  cached {stats["warm_ms"]["median"]:6.2f} ms  '
+                    f'{stats["bytes"]["median"] / 1000:8.1f} KB'
+                )
+
+            if args.concurrency:
+                result['load_test'] = load_test(path, result['cases'], args.concurrency, args.duration)
+                load = result['load_test']
+                print(
+                    f'{scale}x: load test {load["requests_per_second"]:.0f} req/s, p50 {load["latency_ms"]["p50"]:.1f} ms, '
+                    f'p95 {load["latency_ms"]["p95"]:.1f} ms, {load["errors"]} errors', flush=True,
+                )
+            report['scales'][str(scale)] = result
+            os.remove(path)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f'Report written to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/synthetic.py
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from data_loader import CATEGORY_COLUMNS, DATA_FILE, PROVINCE_COLUMN, TYPE_COLUMN, load_data, month_start
+
+
+def _copy_layout(scale):
+    """
+    Place each of the `scale` copies of the source rows in the synthetic key space.
+
+    Copies fill a grid of month blocks by vehicle generations, both about
+    sqrt(scale) long, so the number of months and the number of makes and
+    models grow with the rows. Copy 0 is the source itself.
+
+    Returns:
+        list: (month block, generation) of each copy.
+    """
+    blocks = math.ceil(math.sqrt(scale))
+    return [(copy % blocks, copy // blocks) for copy in range(scale)]
+
+
+def _synthetic_name(name, generation):
+    """Name a make or model of a synthetic vehicle generation, generation 0 keeps the source name."""
+    return name if generation == 0 else f'{name} #{generation}'
+
+
+def _synthetic_copy(df, block, generation, counts):
+    """
+    Build one copy of the source rows, moved to its month block and vehicle generation.
+
+    Month block `block` covers the source months shifted `block` spans
+    earlier, so the latest month stays the latest month of the source.
+
+    Args:
+        df (pd.DataFrame): Source rows, as returned by load_data().
+        block (int): Month block, see _copy_layout().
+        generation (int): Vehicle generation, see _copy_layout().
+        counts (np.ndarray): Sales counts of the copy.
+
+    Returns:
+        pd.DataFrame: The copy, with its own make and model categories.
+    """
+    months = df['Month'].to_numpy()
+    span = int(months.max()) - int(months.min()) + 1 if len(months) else 0
+    copy = df.copy()
+    for column in ('Vehicle Make', 'Vehicle Model'):
+        copy[column] = copy[column].cat.rename_categories(lambda name: _synthetic_name(name, generation))
+    if block:
+        first = int(months.min()) - block * span
+        labels = np.asarray([month_start(code) for code in range(first, first + span)], dtype='datetime64[us]')
+        copy['Month'] = (months - block * span).astype(months.dtype)
+        copy['Month and Year'] = labels[copy['Month'].to_numpy() - first]
+    copy['Number of Cars'] = counts
+    return copy
+
+
+def _copies(df, scale, seed):
+    """Yield the `scale` synthetic copies of the source rows, with their sales counts redrawn around the originals."""
+    counts = df['Number of Cars'].to_numpy()
+    rng = np.random.default_rng(seed)
+    for block, generation in _copy_layout(scale):
+        yield _synthetic_copy(df, block, generation, np.maximum(rng.poisson(counts), 1).astype(counts.dtype))
+
+
+def synthetic_frame(scale, seed=0, path=DATA_FILE):
+    """
+    Build an iZEV-shaped DataFrame with `scale` times the rows of the source CSV.
+
+    The source rows are repeated `scale` times with the sales counts redrawn
+    around their original values. Each copy is moved to earlier months or to
+    new synthetic makes and models (see _copy_layout()), so the month range
+    and the number of vehicles grow with the rows, like a real dataset does,
+    rather than only adding rows over the same keys. The frame has the same
+    columns and dtypes as load_data() returns.
+
+    Args:
+        scale (int): Number of copies of the source rows.
+        seed (int): Random seed for the sales counts.
+        path (str): Source CSV file.
+
+    Returns:
+        pd.DataFrame: Preprocessed car sales rows.
+    """
+    from pandas.api.types import union_categoricals
+
+    copies = list(_copies(load_data(path), scale, seed))
+    synthetic = pd.concat([copy.drop(columns=CATEGORY_COLUMNS) for copy in copies], ignore_index=True)
+    for column in CATEGORY_COLUMNS:
+        synthetic[column] = union_categoricals([copy[column] for copy in copies], sort_categories=True)
+    return synthetic[copies[0].columns]
+
+
+def write_csv(df, path, append=False):
+    """
+    Write a preprocessed frame back out in the layout of car_summary.csv.
+
+    Args:
+        df (pd.DataFrame): Frame as returned by load_data() or synthetic_frame().
+        path (str): Destination file.
+        append (bool): Append the rows to `path`, without a header line.
+    """
+    out = df.rename(columns={'Vehicle Type': TYPE_COLUMN, 'Province/Territory': PROVINCE_COLUMN})
+    out['Month and Year'] = out['Month and Year'].dt.strftime('%B %Y')
+    out[['Vehicle Make', 'Vehicle Model', TYPE_COLUMN, PROVINCE_COLUMN, 'Month and Year', 'Number of Cars']].to_csv(
+        path, index=False, header=not append, mode='a' if append else 'w'
+    )
+
+
+def write_synthetic_csv(scale, path, seed=0, source=DATA_FILE):
+    """
+    Write synthetic_frame(scale) to a CSV file one copy of the source rows at a time.
+
+    Produces the same rows as write_csv(synthetic_frame(scale, seed)) with
+    memory use independent of `scale`, for datasets too large to build in
+    memory at once.
+
+    Args:
+        scale (int): Number of copies of the source rows.
+        path (str): Destination file.
+        seed (int): Random seed for the sales counts.
+        source (str): Source CSV file.
+    """
+    for index, copy in enumerate(_copies(load_data(source), scale, seed)):
+        write_csv(copy, path, append=index > 0)
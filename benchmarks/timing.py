@@ -0,0 +1,15 @@
+# benchmarks/timing.py
+#
+# Timing helpers shared by the micro-benchmarks.
+
+import time
+
+
+def best_of(repeat, func, *args):
+    """Return the fastest of `repeat` calls to func(*args), in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -1,131 +1,193 @@
 # brand_sales.py
 
-from flask import Blueprint, render_template, request
-from data_loader import load_data
-import pandas as pd
-from datetime import datetime
-from pandas.tseries.offsets import DateOffset
+from flask import Blueprint, abort, jsonify, render_template
+from response_cache import cached, filter_param
+from metrics import stage
 
 # Initialize the Blueprint
 brand_sales_bp = Blueprint('brand_sales_bp', __name__, template_folder='templates')
 
-# Load and preprocess data
-df = load_data()
 
-# Get unique vehicle types and provinces/territories
-vehicle_types = ['All'] + sorted(df['Vehicle Type'].dropna().unique())
-provinces = ['All'] + sorted(df['Province/Territory'].dropna().unique())
+def period_totals(sales, latest_month):
+    """
+    Build the per-month and total columns of the brand/model tables.
+
+    Args:
+        sales (np.ndarray): One row per brand or model, one column per month of the past
+            year (oldest first, ending at the latest month; fewer when the data is shorter).
+        latest_month (int): Code of the latest month in the data.
+
+    Returns:
+        tuple: (sales for the past 6 months latest first, 6 month, YTD and past year totals)
+    """
+    import numpy as np
+
+    sales = np.pad(sales, ((0, 0), (12 - sales.shape[1], 0)))
+    monthly = sales[:, :5:-1]
+    return (
+        monthly,
+        monthly.sum(axis=1),
+        sales[:, 11 - latest_month % 12:].sum(axis=1),
+        sales.sum(axis=1),
+    )
+
+
+def sales_columns(sales, latest_month):
+    """
+    Select, sort and total the brand or model rows of the sales tables, as columns.
+
+    Rows with sales in the past 6 months are kept, sorted by latest month
+    sales in descending order.
+
+    Args:
+        sales (np.ndarray): One row per make or vehicle, see period_totals().
+        latest_month (int): Code of the latest month in the data.
+
+    Returns:
+        tuple: (codes of the kept rows, dict of columns: 'monthly' with one list per
+            month latest first, 'past_6_months', 'ytd' and 'past_year')
+    """
+    import numpy as np
+
+    monthly, total_6m, total_ytd, total_1y = period_totals(sales, latest_month)
+    rows = np.flatnonzero(total_6m > 0)
+    rows = rows[np.argsort(-monthly[rows, 0], kind='stable')]
+    return rows, {
+        'monthly': monthly[rows].T.tolist(),
+        'past_6_months': total_6m[rows].tolist(),
+        'ytd': total_ytd[rows].tolist(),
+        'past_year': total_1y[rows].tolist(),
+    }
+
+
+def brand_sales_data(cube, vehicle_type='All', province='All', models=True):
+    """
+    Build the brand and model sales tables as column-oriented arrays.
+
+    Makes and models are sent as codes into the 'makes' and 'models' string
+    lists, so each name is sent once.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        vehicle_type (str): Vehicle type to filter on, 'All' for every type.
+        province (str): Province/territory to filter on, 'All' for every one.
+        models (bool): Whether to include the model table ('models' and 'vehicles').
+
+    Returns:
+        dict: 'months' (past 6 months, latest first), the tooltip ranges
+            'past_6_months_range', 'ytd_range' and 'past_year_range', 'makes',
+            'brands' columns ('make' codes, the sales_columns() columns and the
+            sales_trends() columns, shares being of every brand) and, with `models`,
+            'models' and 'vehicles' columns ('make' and 'model' codes, the
+            sales_columns() and sales_trends() columns, shares being of every model).
+    """
+    import numpy as np
+    from data_loader import month_label
+    from sales_tables import sales_trends
+
+    latest_month = cube.latest_month
+    months = [month_label(latest_month - offset) for offset in range(6)]
+    data = {
+        'months': months,
+        'past_6_months_range': f"{months[-1]} to {months[0]}",
+        'ytd_range': f"{month_label(latest_month - latest_month % 12)} to {months[0]}",
+        'past_year_range': f"{month_label(latest_month - 12)} to {months[0]}",
+        'makes': cube.makes,
+    }
+
+    # Sales per brand and per model for each month of the past year and the month before it,
+    # for year-over-year growth, with the selected filters applied
+    filters = dict(vehicle_type=vehicle_type, province=province, start=latest_month - 12)
+    sales = cube.sum(by=('make', 'month'), **filters)
+    brands, columns = sales_columns(sales[:, -12:], latest_month)
+    data['brands'] = {'make': brands.tolist(), **columns, **sales_trends(sales, rows=brands)}
+
+    if models:
+        sales = cube.sum(by=('vehicle', 'month'), **filters)
+        vehicles, columns = sales_columns(sales[:, -12:], latest_month)
+        columns.update(sales_trends(sales, rows=vehicles))
+        names, model_codes = np.unique(np.asarray(cube.vehicle_models, dtype=object)[vehicles], return_inverse=True)
+        data['models'] = names.tolist()
+        data['vehicles'] = {
+            'make': cube.vehicle_make[vehicles].tolist(),
+            'model': model_codes.tolist(),
+            **columns,
+        }
+    return data
+
 
 @brand_sales_bp.route('/brand_sales', methods=['GET', 'POST'])
+@cached('vehicle_type', 'province')
 def brand_sales():
-    # Determine the last available month in the data
-    last_available_month = df['Month and Year'].max()
-
-    # Get selected filters from form
-    selected_vehicle_type = request.form.get('vehicle_type', 'All')
-    selected_province = request.form.get('province', 'All')
-
-    # Apply filters
-    df_filtered = df.copy()
-    if selected_vehicle_type != 'All':
-        df_filtered = df_filtered[df_filtered['Vehicle Type'] == selected_vehicle_type]
-    if selected_province != 'All':
-        df_filtered = df_filtered[df_filtered['Province/Territory'] == selected_province]
-
-    # Calculate the start dates
-    start_date_6m = last_available_month - DateOffset(months=5)
-    start_date_ytd = datetime(last_available_month.year, 1, 1)
-    start_date_1y = last_available_month - DateOffset(years=1) + DateOffset(days=1)
-
-    # Prepare the past 6 months list (latest to earliest)
-    months_list = pd.date_range(end=last_available_month, periods=6, freq='MS')[::-1]
-
-    # Filter data for the different periods
-    df_6m = df_filtered[(df_filtered['Month and Year'] >= start_date_6m) & (df_filtered['Month and Year'] <= last_available_month)]
-    df_ytd = df_filtered[(df_filtered['Month and Year'] >= start_date_ytd) & (df_filtered['Month and Year'] <= last_available_month)]
-    df_1y = df_filtered[(df_filtered['Month and Year'] >= start_date_1y) & (df_filtered['Month and Year'] <= last_available_month)]
-
-    # Prepare brand data
-    # Sum sales per brand per month for the past 6 months
-    brand_monthly_sales = df_6m.groupby(['Vehicle Make', df_6m['Month and Year'].dt.to_period('M')])['Number of Cars'].sum().unstack(fill_value=0)
-
-    # Reorder columns to match months_list
-    month_periods = [month.to_period('M') for month in months_list]
-    brand_monthly_sales = brand_monthly_sales.reindex(columns=month_periods, fill_value=0)
-
-    # Add total columns
-    brand_monthly_sales['Past 6 Months Total'] = brand_monthly_sales.sum(axis=1)
-    brand_monthly_sales['YTD Total'] = df_ytd.groupby('Vehicle Make')['Number of Cars'].sum()
-    brand_monthly_sales['Past Year Total'] = df_1y.groupby('Vehicle Make')['Number of Cars'].sum()
-    brand_monthly_sales = brand_monthly_sales.fillna(0).reset_index()
-
-    # Sort by latest month's sales in descending order
-    latest_month_period = last_available_month.to_period('M')
-    brand_monthly_sales.sort_values(by=latest_month_period, ascending=False, inplace=True)
-
-    # Prepare model data
-    model_monthly_sales = df_6m.groupby(['Vehicle Make', 'Vehicle Model', df_6m['Month and Year'].dt.to_period('M')])['Number of Cars'].sum().unstack(fill_value=0)
-
-    # Reorder columns to match months_list
-    model_monthly_sales = model_monthly_sales.reindex(columns=month_periods, fill_value=0)
-
-    # Add total columns
-    model_monthly_sales['Past 6 Months Total'] = model_monthly_sales.sum(axis=1)
-    model_monthly_sales['YTD Total'] = df_ytd.groupby(['Vehicle Make', 'Vehicle Model'])['Number of Cars'].sum()
-    model_monthly_sales['Past Year Total'] = df_1y.groupby(['Vehicle Make', 'Vehicle Model'])['Number of Cars'].sum()
-    model_monthly_sales = model_monthly_sales.fillna(0).reset_index()
-
-    # Sort by latest month's sales in descending order
-    latest_month_period = last_available_month.to_period('M')
-    model_monthly_sales.sort_values(by=latest_month_period, ascending=False, inplace=True)
-
-    # Convert months to string format for display
-    months_str = [month.strftime('%b %Y') for month in months_list]
-
-    # Prepare brand data records
-    brand_data = brand_monthly_sales.to_dict('records')
-
-    # Prepare model data records, organized by brand
-    model_data = {}
-    for _, row in model_monthly_sales.iterrows():
-        brand = row['Vehicle Make']
-        if brand not in model_data:
-            model_data[brand] = []
-        model_data[brand].append(row.to_dict())
-
-    # Calculate date ranges for tooltips
-    past_6_months_range = f"{months_str[-1]} to {months_str[0]}"
-    ytd_range = f"{start_date_ytd.strftime('%b %Y')} to {last_available_month.strftime('%b %Y')}"
-    past_year_range = f"{(last_available_month - DateOffset(years=1) + DateOffset(days=1)).strftime('%b %Y')} to {last_available_month.strftime('%b %Y')}"
+    # The data layer is imported on first use, so the app starts without it (see warmup.py)
+    import numpy as np
+    import pandas as pd
+    from data_loader import get_dataset, month_start
+
+    cube = get_dataset().cube
+
+    # Get selected filters from the form (query string or posted)
+    selected_vehicle_type = filter_param('vehicle_type')
+    selected_province = filter_param('province')
+    try:
+        cube.check_filters(selected_vehicle_type, selected_province)
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    # Brand rows are rendered with the page, model rows are fetched from
+    # brand_sales_json() and rendered client-side when a brand is expanded
+    with stage('aggregate'):
+        table = brand_sales_data(cube, selected_vehicle_type, selected_province, models=False)
+
+        # Monthly sales per brand over the whole history, with the selected filters applied
+        sales_by_brand = cube.sum(by=('month', 'make'), vehicle_type=selected_vehicle_type, province=selected_province)
+        months_with_sales = cube.months[sales_by_brand.sum(axis=1) > 0]
 
     # **New Code Starts Here**
     # Identify top 5 brands based on total sales in the past month
-    latest_month = df_filtered['Month and Year'].max()
-    sales_past_month = df_filtered[df_filtered['Month and Year'] == latest_month]
-    sales_by_brand_past_month = sales_past_month.groupby('Vehicle Make')['Number of Cars'].sum().sort_values(ascending=False)
-    top_5_brands = sales_by_brand_past_month.head(5).index.tolist()
+    top_5_brands = []
+    if len(months_with_sales):
+        sales_past_month = sales_by_brand[months_with_sales[-1] - cube.months[0]]
+        top_5_brands = [
+            cube.makes[code]
+            for code in np.argsort(-sales_past_month, kind='stable')[:5]
+            if sales_past_month[code] > 0
+        ]
     # **New Code Ends Here**
 
-    # Aggregate monthly sales data per brand for the line chart
-    sales_by_brand = df_filtered.groupby(['Vehicle Make', 'Month and Year'])['Number of Cars'].sum().reset_index()
-    
     # Pivot the data to have months as x-axis and brands as separate lines
-    sales_pivot = sales_by_brand.pivot(index='Month and Year', columns='Vehicle Make', values='Number of Cars').fillna(0)
-    
+    brands_with_sales = sales_by_brand.sum(axis=0) > 0
+    sales_pivot = pd.DataFrame(
+        sales_by_brand[np.ix_(months_with_sales - cube.months[0], brands_with_sales)],
+        index=pd.DatetimeIndex([month_start(code) for code in months_with_sales], name='Month and Year'),
+        columns=pd.Index([name for name, keep in zip(cube.makes, brands_with_sales) if keep], name='Vehicle Make'),
+    )
+
     # Convert the pivot table to JSON for Plotly
-    sales_by_brand_json = sales_pivot.to_json(date_format='iso')
-
-    return render_template('brand_sales/brand_sales.html',
-                           brand_data=brand_data,
-                           model_data=model_data,
-                           months=months_str,
-                           month_periods=month_periods,
-                           vehicle_types=vehicle_types,
-                           selected_vehicle_type=selected_vehicle_type,
-                           provinces=provinces,
-                           selected_province=selected_province,
-                           past_6_months_range=past_6_months_range,
-                           ytd_range=ytd_range,
-                           past_year_range=past_year_range,
-                           sales_by_brand_json=sales_by_brand_json,
-                           top_5_brands=top_5_brands)  # **Added Parameter**
\ No newline at end of file
+    with stage('serialize'):
+        sales_by_brand_json = sales_pivot.to_json(date_format='iso')
+
+    with stage('render'):
+        return render_template('brand_sales/brand_sales.html',
+                               table=table,
+                               vehicle_types=['All'] + cube.vehicle_types,
+                               selected_vehicle_type=selected_vehicle_type,
+                               provinces=['All'] + cube.provinces,
+                               selected_province=selected_province,
+                               sales_by_brand_json=sales_by_brand_json,
+                               top_5_brands=top_5_brands)  # **Added Parameter**
+
+@brand_sales_bp.route('/brand_sales/data', methods=['GET', 'POST'])
+@cached('vehicle_type', 'province')
+def brand_sales_json():
+    from data_loader import get_dataset
+
+    cube = get_dataset().cube
+    try:
+        cube.check_filters(filter_param('vehicle_type'), filter_param('province'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    with stage('aggregate'):
+        data = brand_sales_data(cube, filter_param('vehicle_type'), filter_param('province'))
+    with stage('serialize'):
+        return jsonify(data)
@@ -0,0 +1,125 @@
+# charts.py
+
+import functools
+import hashlib
+import importlib.util
+import os
+import re
+
+from flask import Blueprint, abort, request, url_for
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional, JSON is encoded with the standard library without it
+    orjson = None
+
+# Initialize the Blueprint
+charts_bp = Blueprint('charts_bp', __name__)
+
+# plotly.js as bundled with the plotly Python package, so the client renders
+# figures with the same version that produced them
+PLOTLY_JS_PATH = os.path.join(
+    importlib.util.find_spec('plotly').submodule_search_locations[0], 'package_data', 'plotly.min.js'
+)
+
+# The asset URL changes whenever its content does, so it can be cached for good
+PLOTLY_JS_MAX_AGE = 365 * 24 * 60 * 60
+
+# Significant digits kept of the floats in figure JSON, e.g. template colorscale stops
+FIGURE_FLOAT_DIGITS = 6
+
+# Timestamps at midnight, as Plotly serializes the monthly x values
+MIDNIGHT = re.compile(r'(\d{4}-\d{2}-\d{2})T00:00:00(?:\.0+)?')
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider writing no whitespace, in templates (tojson) as well as in jsonify() responses.
+
+    Encodes with orjson when it is installed, unless custom encoder arguments are
+    given. Dates and other types orjson does not handle the way Flask does are
+    still encoded by DefaultJSONProvider.default().
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and kwargs.keys() <= {'sort_keys'}:
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            if kwargs.get('sort_keys', self.sort_keys):
+                option |= orjson.OPT_SORT_KEYS
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        kwargs.setdefault('separators', (',', ':'))
+        return super().dumps(obj, **kwargs)
+
+
+@functools.lru_cache(maxsize=None)
+def plotly_js_digest():
+    """Return a short content hash of the bundled plotly.js, used in its URL."""
+    with open(PLOTLY_JS_PATH, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+@functools.lru_cache(maxsize=None)
+def plotly_js_entry():
+    """
+    Return the bundled plotly.js with its compressed bodies, compressed once per process.
+
+    Returns:
+        CachedResponse: See response_cache.CachedResponse.
+    """
+    from datetime import datetime, timezone
+    from response_cache import CachedResponse
+
+    with open(PLOTLY_JS_PATH, 'rb') as f:
+        body = f.read()
+    modified = datetime.fromtimestamp(os.path.getmtime(PLOTLY_JS_PATH), timezone.utc)
+    return CachedResponse(body, 'text/javascript', modified)
+
+
+def plotly_js_url():
+    """Return the content-hashed URL of plotly.js."""
+    return url_for('charts_bp.plotly_js', digest=plotly_js_digest())
+
+
+def compact_figure(value):
+    """
+    Shorten the values of figure JSON without changing the rendered figure.
+
+    Floats are rounded to FIGURE_FLOAT_DIGITS significant digits and midnight
+    timestamps are cut to their date, which plotly.js reads as the same time.
+
+    Args:
+        value: Decoded figure JSON, or any value within it.
+
+    Returns:
+        The value, with every float and timestamp in it shortened.
+    """
+    if isinstance(value, float):
+        return float(f'{value:.{FIGURE_FLOAT_DIGITS}g}')
+    if isinstance(value, str):
+        match = MIDNIGHT.fullmatch(value)
+        return match.group(1) if match else value
+    if isinstance(value, dict):
+        return {key: compact_figure(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [compact_figure(item) for item in value]
+    return value
+
+
+@charts_bp.route('/assets/plotly-<digest>.min.js')
+def plotly_js(digest):
+    from response_cache import encoded_response
+
+    if digest != plotly_js_digest():
+        abort(404)
+    # Sent precompressed like cached responses, the bundle is 4.8 MB uncompressed
+    response = encoded_response(plotly_js_entry())
+    response.cache_control.public = True
+    response.cache_control.max_age = PLOTLY_JS_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+@charts_bp.app_context_processor
+def inject_plotly_js_url():
+    return {'plotly_js_url': plotly_js_url}
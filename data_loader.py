@@ -1,42 +1,566 @@
 # data_loader.py
 
+import functools
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
 import pandas as pd
 
-def load_data():
+from model_index import ModelIndex
+from sales_cube import SalesCube
+from search_index import SearchIndex
+
+# The data file, overridable with IZEV_DATA_FILE, e.g. to serve a synthetic dataset
+DATA_FILE = os.environ.get('IZEV_DATA_FILE', 'car_summary.csv')
+
+# Columns read from the CSV, mapped to the names used throughout the app
+TYPE_COLUMN = 'Battery-Electric Vehicle (BEV), Plug-in Hybrid Electric Vehicle (PHEV) or Fuel Cell Electric Vehicle (FCEV)'
+PROVINCE_COLUMN = 'Recipient Province/Territory'
+SOURCE_COLUMNS = ['Vehicle Make', 'Vehicle Model', TYPE_COLUMN, PROVINCE_COLUMN, 'Month and Year', 'Number of Cars']
+CATEGORY_COLUMNS = ['Vehicle Make', 'Vehicle Model', 'Vehicle Type', 'Province/Territory']
+
+# Directory, next to the data file, holding the columnar cache of its preprocessed rows (see load_columnar)
+CACHE_DIR = '.data_cache'
+
+# Seconds between checks of the data file for changes (see start_watcher)
+WATCH_INTERVAL = 30
+
+# Process-wide dataset store (see get_dataset)
+_dataset = None
+_dataset_lock = threading.Lock()
+_watcher = None
+
+
+class Dataset:
+    """
+    The car sales data together with the aggregates derived from it at load time.
+
+    Attributes:
+        df (pd.DataFrame): Preprocessed car sales rows (see load_data).
+        cube (SalesCube): Sales counts by month, province, vehicle type and vehicle.
+        search (SearchIndex): Make and model name index, with the sales of each vehicle.
+        models (ModelIndex): Sales of each make and model, looked up by name.
+        version (str): Content hash of the source CSV, identifies cached responses.
+        modified (datetime): Modification time of the source CSV, None when unknown.
+        source_stat (tuple): (mtime_ns, size) of the source CSV when it was read, None when unknown.
+        loaded_at (datetime): When the dataset was built.
+    """
+
+    def __init__(self, df, version='', modified=None, source_stat=None, cube=None):
+        self.df = df
+        self.cube = SalesCube(df) if cube is None else cube
+        self.search = SearchIndex(self.cube)
+        self.models = ModelIndex(self.cube)
+        self.version = version
+        self.modified = modified
+        self.source_stat = source_stat
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def extend(self, rows, **source):
+        """
+        Return a new Dataset with `rows` appended, updating the aggregates incrementally.
+
+        Only the new rows are parsed and aggregated; the result is merged into
+        a copy of the existing cube. Everything else is still rebuilt whole: the
+        rows are concatenated into a new frame, and the search and model indexes
+        are rebuilt from the merged cube, so their cost grows with the history
+        rather than with the new rows. This dataset is left unchanged.
+
+        Args:
+            rows (pd.DataFrame): Preprocessed rows to append (see load_data).
+            **source: version, modified and source_stat of the new dataset.
+
+        Returns:
+            Dataset: The extended dataset.
+        """
+        return Dataset(_append_rows(self.df, rows), cube=self.cube.combine(SalesCube(rows)), **source)
+
+
+def month_code(timestamps):
+    """
+    Convert timestamps to compact integer month periods (year * 12 + month - 1).
+
+    Args:
+        timestamps: A pd.Timestamp, DatetimeIndex or datetime Series.
+
+    Returns:
+        int or array of ints: The month period code(s).
+    """
+    return timestamps.year * 12 + timestamps.month - 1
+
+
+def month_start(code):
+    """
+    Convert an integer month period back to the timestamp of the first of that month.
+
+    Args:
+        code (int): Month period code as produced by month_code().
+
+    Returns:
+        pd.Timestamp: First day of the month.
+    """
+    year, month = divmod(int(code), 12)
+    return pd.Timestamp(year=year, month=month + 1, day=1)
+
+
+def month_label(code, fmt='%b %Y'):
+    """Format an integer month period for display."""
+    return month_start(code).strftime(fmt)
+
+
+def parse_month(text):
+    """
+    Parse a 'YYYY-MM' month into its integer month period.
+
+    Args:
+        text (str): The month, e.g. '2024-06'.
+
+    Returns:
+        int: The month period code.
+
+    Raises:
+        ValueError: If `text` is not a valid 'YYYY-MM' month.
+    """
+    year, sep, month = str(text).strip().partition('-')
+    if not (sep and year.isdigit() and month.isdigit() and 1 <= int(month) <= 12):
+        raise ValueError(f"Invalid month '{text}', expected YYYY-MM")
+    return int(year) * 12 + int(month) - 1
+
+
+def _strip_category(series):
+    """Strip whitespace from a categorical column by renaming its categories."""
+    stripped = series.cat.categories.str.strip()
+    if stripped.is_unique:
+        return series.cat.rename_categories(stripped)
+    # Stripping merged two categories, fall back to a per-row strip
+    return series.astype(str).str.strip().astype('category')
+
+
+def load_data(path=DATA_FILE):
     """
     Load and preprocess the car sales data from a CSV file.
-    
+
+    Make, model, vehicle type and province are kept as categoricals, the month
+    is stored both as a timestamp ('Month and Year') and as an int16 month
+    period ('Month'), and the sales counts are downcast to the smallest integer
+    type that holds them.
+
+    Args:
+        path (str or file-like): Path to the CSV file, or its content.
+
     Returns:
         pd.DataFrame: Preprocessed DataFrame containing car sales data.
     """
     try:
-        # Replace 'car_sales_data.csv' with your actual CSV file name
-        df = pd.read_csv('car_summary.csv')
-        
-        # Preprocess data as needed
-        df['Month and Year'] = pd.to_datetime(df['Month and Year'], format='%B %Y')
-        df['Vehicle Make'] = df['Vehicle Make'].str.strip()
-        df['Vehicle Model'] = df['Vehicle Model'].str.strip()
-        df['Vehicle Type'] = df['Battery-Electric Vehicle (BEV), Plug-in Hybrid Electric Vehicle (PHEV) or Fuel Cell Electric Vehicle (FCEV)']
-        df['Province/Territory'] = df['Recipient Province/Territory']
-        
-        return df
+        df = pd.read_csv(
+            path,
+            dtype={
+                'Vehicle Make': 'category',
+                'Vehicle Model': 'category',
+                TYPE_COLUMN: 'category',
+                PROVINCE_COLUMN: 'category',
+                'Month and Year': 'category',
+            },
+        )
     except FileNotFoundError:
-        print("Error: The data file 'car_sales_data.csv' was not found.")
+        print(f"Error: The data file '{path}' was not found.")
         return pd.DataFrame()
 
-def get_unique_values(df):
+    missing = [column for column in SOURCE_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"The data file is missing the columns {missing}")
+    if not pd.api.types.is_integer_dtype(df['Number of Cars']):
+        raise ValueError("'Number of Cars' must be whole numbers")
+
+    df = df[SOURCE_COLUMNS].rename(columns={TYPE_COLUMN: 'Vehicle Type', PROVINCE_COLUMN: 'Province/Territory'})
+
+    # Rows with a blank make, model, type, province or month cannot be placed in the cube
+    missing_keys = df[CATEGORY_COLUMNS + ['Month and Year']].isna().any(axis=1)
+    if missing_keys.any():
+        print(f"Warning: Skipped {int(missing_keys.sum())} rows with a blank make, model, type, province or month.")
+        df = df[~missing_keys].reset_index(drop=True)
+    for column in CATEGORY_COLUMNS:
+        df[column] = _strip_category(df[column])
+
+    # Only the distinct month labels need parsing, rows just reference them
+    months = df['Month and Year']
+    month_dates = pd.to_datetime(months.cat.categories, format='%B %Y')
+    codes = months.cat.codes.to_numpy()
+    df['Month and Year'] = month_dates[codes]
+    df['Month'] = month_code(month_dates).to_numpy().astype('int16')[codes]
+
+    df['Number of Cars'] = pd.to_numeric(df['Number of Cars'], downcast='integer')
+
+    return df
+
+
+def _append_rows(df, rows):
+    """Concatenate two frames returned by load_data(), keeping the categorical columns categorical."""
+    if df.empty:
+        return rows
+    columns = {}
+    for column in df.columns:
+        if column in CATEGORY_COLUMNS:
+            columns[column] = pd.api.types.union_categoricals([df[column], rows[column]])
+        else:
+            columns[column] = np.concatenate([df[column].to_numpy(), rows[column].to_numpy()])
+    return pd.DataFrame(columns)
+
+
+@functools.lru_cache(maxsize=None)
+def _loader_fingerprint():
+    """
+    Return a hash of the code columnar caches are written by: this module and the numpy and pandas versions.
+
+    Caches are keyed by it as well as by the data file content, so a change
+    to the preprocessing or to the cache layout never loads a cache written
+    by the previous code.
+
+    Returns:
+        str: Short content hash.
+    """
+    digest = hashlib.sha256(f'{np.__version__}/{pd.__version__}'.encode())
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()[:8]
+
+
+def _columnar_path(path, version):
+    """Return the columnar cache directory of the given version of the data file, for the running loader."""
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIR, f'{name}-{version}-{_loader_fingerprint()}')
+
+
+def save_columnar(df, directory):
+    """
+    Save a frame returned by load_data() as one .npy file per column.
+
+    Categorical columns are stored as their integer codes, with the
+    categories in meta.json. 'Month and Year' is not stored, it is rebuilt
+    from the 'Month' periods. The directory is written next to its final
+    location and renamed into place, so readers never see a partial cache.
+
+    Args:
+        df (pd.DataFrame): Preprocessed car sales rows.
+        directory (str): Cache directory to create.
+    """
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent)
+    try:
+        meta = {'columns': list(df.columns), 'categories': {}}
+        for i, column in enumerate(df.columns):
+            if column == 'Month and Year':
+                continue
+            values = df[column]
+            if column in CATEGORY_COLUMNS:
+                meta['categories'][column] = [str(name) for name in values.cat.categories]
+                values = values.cat.codes
+            np.save(os.path.join(staging, f'{i}.npy'), values.to_numpy())
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        os.replace(staging, directory)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+        # Another process wrote the same cache first
+
+
+def load_columnar(directory):
+    """
+    Load a frame saved by save_columnar(), memory-mapping its columns.
+
+    The stored columns are wrapped without copying, each in its own block,
+    so they stay backed by the mapped files and their pages are shared with
+    every process mapping the same cache. Only 'Month and Year' is rebuilt in
+    memory.
+
+    Args:
+        directory (str): Cache directory.
+
+    Returns:
+        pd.DataFrame: The same frame load_data() returns for the source CSV.
+    """
+    with open(os.path.join(directory, 'meta.json')) as f:
+        meta = json.load(f)
+
+    columns = {}
+    for i, column in enumerate(meta['columns']):
+        if column == 'Month and Year':
+            continue
+        values = np.load(os.path.join(directory, f'{i}.npy'), mmap_mode='r')
+        if column in meta['categories']:
+            values = pd.Categorical.from_codes(values, meta['categories'][column])
+        columns[column] = values
+
+    # Rebuild the timestamps from the distinct month periods
+    month_codes, inverse = np.unique(columns['Month'], return_inverse=True)
+    years, months = np.divmod(month_codes.astype(int), 12)
+    month_dates = pd.to_datetime(pd.DataFrame({'year': years, 'month': months + 1, 'day': 1}))
+    columns['Month and Year'] = month_dates.to_numpy()[inverse.ravel()]
+
+    # copy=False keeps one block per column instead of consolidating the columns
+    # of a dtype into a new array; pandas copies on write, the maps stay read-only
+    return pd.DataFrame({column: columns[column] for column in meta['columns']}, copy=False)
+
+
+def _read_source(path):
+    """Read the raw bytes of the data file, returning (raw, stat)."""
+    with open(path, 'rb') as f:
+        return f.read(), os.fstat(f.fileno())
+
+
+def _content_version(raw):
+    """Return the dataset version of the data file content."""
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def _remove_columnar(path):
+    """Remove the columnar caches of every version of the data file."""
+    cache_dir = os.path.dirname(_columnar_path(path, ''))
+    prefix = os.path.basename(path) + '-'
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.startswith(prefix):
+                shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+
+
+def _load_frame(path, raw, version, use_cache):
+    """Load the preprocessed rows from the columnar cache, or parse `raw` and create the cache."""
+    if not use_cache:
+        return load_data(io.BytesIO(raw))
+
+    directory = _columnar_path(path, version)
+    if os.path.isdir(directory):
+        try:
+            return load_columnar(directory)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: Ignoring unreadable cache '{directory}': {e}")
+
+    df = load_data(io.BytesIO(raw))
+    try:
+        _remove_columnar(path)
+        save_columnar(df, directory)
+    except OSError as e:
+        print(f"Error: Could not write cache '{directory}': {e}")
+    return df
+
+
+def _build_dataset(path, raw, stat, use_cache=True):
+    version = _content_version(raw)
+    return Dataset(
+        _load_frame(path, raw, version, use_cache),
+        version=version,
+        modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+        source_stat=(stat.st_mtime_ns, stat.st_size),
+    )
+
+
+def load_dataset(path=DATA_FILE, use_cache=True):
+    """
+    Load the car sales CSV into a Dataset, versioned by a hash of the file content.
+
+    The preprocessed rows are read from the columnar cache of that version of
+    the file when there is one; otherwise the CSV is parsed and the cache
+    written for the next start.
+
+    Args:
+        path (str): Path to the CSV file.
+        use_cache (bool): Whether to read and write the columnar cache.
+
+    Returns:
+        Dataset: The loaded data, empty when the file is missing.
+    """
+    try:
+        raw, stat = _read_source(path)
+    except FileNotFoundError:
+        print(f"Error: The data file '{path}' was not found.")
+        return Dataset(pd.DataFrame())
+
+    return _build_dataset(path, raw, stat, use_cache)
+
+
+def get_dataset():
+    """
+    Return the process-wide Dataset, loading it on first use.
+
+    The dataset is shared by every request and must be treated as read-only.
+
+    Returns:
+        Dataset: The loaded car sales data and its aggregates.
+    """
+    global _dataset
+    if _dataset is None:
+        with _dataset_lock:
+            if _dataset is None:
+                _dataset = load_dataset()
+    return _dataset
+
+
+def _compare_source(raw, dataset):
+    """
+    Compare the content of the data file with the content `dataset` was loaded from.
+
+    The file is hashed in a single pass: when it may be the old content with
+    lines appended, the hash of its first part is checked against the dataset
+    version, then continued over the appended bytes.
+
+    Returns:
+        tuple: (version of `raw` as _content_version() computes it, whether `raw` is the
+            content of `dataset` with whole lines appended)
+    """
+    old_size = dataset.source_stat[1] if dataset.source_stat is not None else 0
+    may_append = not dataset.df.empty and 0 < old_size < len(raw) and raw[old_size - 1:old_size] == b'\n'
+    split = old_size if may_append else 0
+
+    hasher = hashlib.sha256(memoryview(raw)[:split])
+    appended = may_append and hasher.hexdigest()[:16] == dataset.version
+    hasher.update(memoryview(raw)[split:])
+    return hasher.hexdigest()[:16], appended
+
+
+def reload_dataset(path=DATA_FILE):
     """
-    Extract unique vehicle types and provinces/territories from the DataFrame.
-    
+    Reload the data file if it changed and atomically swap in the new Dataset.
+
+    The new dataset and everything derived from it are built before the swap,
+    so requests keep being served from the previous snapshot meanwhile, and
+    requests already holding it finish on it. When rows were only appended to
+    the file, just those rows are parsed and added to the current dataset
+    (see Dataset.extend()).
+
     Args:
-        df (pd.DataFrame): The car sales DataFrame.
-        
+        path (str): Path to the CSV file.
+
     Returns:
-        tuple: (vehicle_types, provinces, vehicle_models)
+        bool: Whether a new dataset was swapped in.
     """
-    vehicle_types = ['All'] + sorted(df['Vehicle Type'].dropna().unique())
-    provinces = ['All'] + sorted(df['Province/Territory'].dropna().unique())
-    vehicle_models = sorted(df['Vehicle Model'].dropna().unique())
-    
-    return vehicle_types, provinces, vehicle_models
\ No newline at end of file
+    global _dataset
+    current = get_dataset()
+    try:
+        stat = os.stat(path)
+        if (stat.st_mtime_ns, stat.st_size) == current.source_stat:
+            return False
+        raw, stat = _read_source(path)
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        print(f"Error: Could not read '{path}': {e}")
+        return False
+
+    version, appended = _compare_source(raw, current)
+    if version == current.version:
+        # Touched but not changed, nothing to rebuild
+        current.source_stat = (stat.st_mtime_ns, stat.st_size)
+        return False
+
+    try:
+        if appended:
+            # Rows were appended to the file: only parse and aggregate those
+            old_size = current.source_stat[1]
+            header = raw[:raw.index(b'\n') + 1]
+            dataset = current.extend(
+                load_data(io.BytesIO(header + raw[old_size:])),
+                version=version,
+                modified=datetime.fromtimestamp(stat.st_mtime, timezone.utc),
+                source_stat=(stat.st_mtime_ns, stat.st_size),
+            )
+        else:
+            dataset = _build_dataset(path, raw, stat)
+    except Exception as e:
+        # Most likely the file is still being written, try again on the next check
+        print(f"Error: Reloading '{path}' failed: {e}")
+        return False
+    del raw
+
+    with _dataset_lock:
+        _dataset = dataset
+    return True
+
+
+def ingest_file(delta_path, path=DATA_FILE):
+    """
+    Append the rows of a delta CSV, e.g. a new month of data, to the data file and load them.
+
+    The delta must have the same columns as the data file. Only its rows are
+    parsed and aggregated, see reload_dataset().
+
+    Args:
+        delta_path (str): CSV file with the rows to add, including its header line.
+        path (str): Path to the data file.
+
+    Returns:
+        int: Number of rows ingested.
+    """
+    with open(delta_path, 'rb') as f:
+        delta = f.read()
+    with open(path, 'rb') as f:
+        header = f.readline()
+
+    delta_header, _, body = delta.partition(b'\n')
+    if delta_header.strip() != header.strip():
+        raise ValueError(f"'{delta_path}' does not have the columns of '{path}'")
+    rows = load_data(io.BytesIO(delta))
+    if rows.empty:
+        return 0
+
+    with open(path, 'ab') as f:
+        if f.tell() and not _ends_with_newline(path):
+            f.write(b'\n')
+        f.write(body if body.endswith(b'\n') else body + b'\n')
+    reload_dataset(path)
+    return len(rows)
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+def _watch(path, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            reload_dataset(path)
+        except Exception as e:
+            # Keep watching, the next change may well load
+            print(f"Error: Checking '{path}' for changes failed: {e}")
+
+
+def start_watcher(path=DATA_FILE, interval=WATCH_INTERVAL):
+    """
+    Start a background thread reloading the data file whenever it changes.
+
+    Only one watcher runs per process, later calls are ignored.
+
+    Args:
+        path (str): Path to the CSV file.
+        interval (float): Seconds between checks.
+    """
+    global _watcher
+    with _dataset_lock:
+        if _watcher is not None:
+            return
+        _watcher = threading.Thread(target=_watch, args=(path, interval), name='data-watcher', daemon=True)
+        _watcher.start()
+
+
+def _after_fork_in_child():
+    # Threads do not survive a fork: a forked process has no watcher unless it
+    # starts one, and must not inherit a lock held by a thread of the parent
+    global _watcher, _dataset_lock
+    _watcher = None
+    _dataset_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
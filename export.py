@@ -0,0 +1,206 @@
+# export.py
+#
+# Streams filtered extracts of the sales rows as CSV or NDJSON, a chunk of rows
+# at a time, so memory use does not grow with the size of the extract.
+
+import csv
+import io
+import json
+
+from flask import Blueprint, Response, jsonify
+from response_cache import filter_param, filter_values
+
+# Initialize the Blueprint
+export_bp = Blueprint('export_bp', __name__)
+
+# Rows filtered and formatted per chunk of the response
+EXPORT_CHUNK_ROWS = 50_000
+
+# Filter parameters and the row column each one applies to, as in brand_sales()
+EXPORT_FILTERS = {
+    'vehicle_type': 'Vehicle Type',
+    'province': 'Province/Territory',
+    'make': 'Vehicle Make',
+    'model': 'Vehicle Model',
+}
+
+# Columns of an export row, in output order
+EXPORT_COLUMNS = ['Vehicle Make', 'Vehicle Model', 'Vehicle Type', 'Province/Territory', 'Month and Year', 'Number of Cars']
+
+
+def _category_lookup(column, values):
+    """Return a boolean array, indexed by category code, of the categories in `values`."""
+    import numpy as np
+
+    return np.asarray(column.cat.categories.isin(values))
+
+
+def export_chunks(df, start=None, end=None, chunk_rows=EXPORT_CHUNK_ROWS, **filters):
+    """
+    Yield the rows of `df` matching the filters, in file order, one chunk at a time.
+
+    Filters are resolved once to lookups over category codes; each chunk is
+    then filtered on slices of the code arrays, which are views of the
+    (possibly memory-mapped) columns.
+
+    Args:
+        df (pd.DataFrame): Preprocessed rows, see data_loader.load_data().
+        start (int): First month code, None for no lower bound.
+        end (int): Last month code, None for no upper bound.
+        chunk_rows (int): Rows scanned per chunk.
+        **filters: Lists of names to keep, keyed by EXPORT_FILTERS parameter, None for no filter.
+
+    Yields:
+        tuple: (dict of category codes per category column, month codes, sales) for the
+            matching rows of one chunk.
+    """
+    import numpy as np
+
+    codes = {column: df[column].cat.codes.to_numpy() for column in EXPORT_FILTERS.values()}
+    lookups = {
+        EXPORT_FILTERS[name]: _category_lookup(df[EXPORT_FILTERS[name]], values)
+        for name, values in filters.items() if values is not None
+    }
+    months = df['Month'].to_numpy()
+    sales = df['Number of Cars'].to_numpy()
+
+    for lo in range(0, len(df), chunk_rows):
+        hi = min(lo + chunk_rows, len(df))
+        # Code -1 is a missing name, it would otherwise index the last category
+        keep = np.ones(hi - lo, dtype=bool)
+        for column_codes in codes.values():
+            keep &= column_codes[lo:hi] >= 0
+        for column, lookup in lookups.items():
+            keep &= lookup[codes[column][lo:hi]]
+        if start is not None:
+            keep &= months[lo:hi] >= start
+        if end is not None:
+            keep &= months[lo:hi] <= end
+        if keep.any():
+            yield (
+                {column: column_codes[lo:hi][keep] for column, column_codes in codes.items()},
+                months[lo:hi][keep],
+                sales[lo:hi][keep],
+            )
+
+
+def _month_labels(months, fmt):
+    """
+    Label every month from the first to the last month code of `months`.
+
+    Returns:
+        tuple: (first month code, object array of labels indexed by code - first)
+    """
+    import numpy as np
+    from data_loader import month_label
+
+    first, last = (int(months.min()), int(months.max())) if len(months) else (0, -1)
+    return first, np.asarray([month_label(code, fmt) for code in range(first, last + 1)], dtype=object)
+
+
+def _chunk_labels(names, months, chunk_codes, chunk_months):
+    """Map the codes of one chunk to per-category labels, in EXPORT_COLUMNS order (sales excluded)."""
+    first, month_names = months
+    columns = [names[column][chunk_codes[column]] for column in EXPORT_COLUMNS[:4]]
+    return columns + [month_names[chunk_months - first]]
+
+
+def stream_csv(df, **query):
+    """
+    Stream the matching rows as CSV, with the columns and month format of the source file.
+
+    Args:
+        df (pd.DataFrame): Preprocessed rows.
+        **query: Filters and month range, see export_chunks().
+
+    Yields:
+        str: The header line, then the CSV lines of each chunk.
+    """
+    import numpy as np
+    from data_loader import PROVINCE_COLUMN, TYPE_COLUMN
+
+    names = {column: np.asarray(df[column].cat.categories, dtype=object) for column in EXPORT_FILTERS.values()}
+    months = _month_labels(df['Month'].to_numpy(), '%B %Y')
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['Vehicle Make', 'Vehicle Model', TYPE_COLUMN, PROVINCE_COLUMN, 'Month and Year', 'Number of Cars'])
+    yield buffer.getvalue()
+
+    for chunk_codes, chunk_months, chunk_sales in export_chunks(df, **query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(zip(*_chunk_labels(names, months, chunk_codes, chunk_months), chunk_sales.tolist()))
+        yield buffer.getvalue()
+
+
+def stream_ndjson(df, **query):
+    """
+    Stream the matching rows as newline-delimited JSON objects keyed by EXPORT_COLUMNS.
+
+    Months are sent as YYYY-MM. Every category name is JSON encoded once,
+    rows are assembled from the encoded names.
+
+    Args:
+        df (pd.DataFrame): Preprocessed rows.
+        **query: Filters and month range, see export_chunks().
+
+    Yields:
+        str: The JSON lines of each chunk.
+    """
+    import numpy as np
+
+    names = {
+        column: np.asarray([json.dumps(str(name)) for name in df[column].cat.categories], dtype=object)
+        for column in EXPORT_FILTERS.values()
+    }
+    months = _month_labels(df['Month'].to_numpy(), '"%Y-%m"')
+    keys = [json.dumps(column) for column in EXPORT_COLUMNS]
+    row = '{{' + ','.join(f'{key}:{{}}' for key in keys) + '}}\n'
+
+    for chunk_codes, chunk_months, chunk_sales in export_chunks(df, **query):
+        columns = _chunk_labels(names, months, chunk_codes, chunk_months)
+        yield ''.join(row.format(*values) for values in zip(*columns, chunk_sales.tolist()))
+
+
+# Response formats of /export.<fmt>
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson'),
+}
+
+
+@export_bp.route('/export.<fmt>', methods=['GET', 'POST'])
+def export(fmt):
+    """
+    Stream a filtered extract, e.g. /export.csv?vehicle_type=PHEV&province=Quebec&start=2023-07.
+
+    Takes the vehicle_type and province filters of /brand_sales, plus make,
+    model and an inclusive start/end YYYY-MM month range. Filters can be
+    repeated to select several values.
+    """
+    from data_loader import get_dataset, parse_month
+
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown format '{fmt}', expected any of {', '.join(EXPORT_FORMATS)}"}), 404
+
+    try:
+        start, end = (filter_param(name) for name in ('start', 'end'))
+        query = {
+            'start': None if start == 'All' else parse_month(start),
+            'end': None if end == 'All' else parse_month(end),
+        }
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    for name in EXPORT_FILTERS:
+        values = filter_values(name)
+        query[name] = None if values == ('All',) else list(values)
+
+    # The generator keeps this snapshot, a reload while streaming does not change the extract
+    dataset = get_dataset()
+    if dataset.df.empty:
+        return jsonify({'error': 'Data not loaded correctly.'}), 503
+    stream, mimetype = EXPORT_FORMATS[fmt]
+    response = Response(stream(dataset.df, **query), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=izev-sales-{dataset.version}.{fmt}'
+    return response
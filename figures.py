@@ -0,0 +1,193 @@
+# figures.py
+#
+# Builds the dashboard charts as the plain data/layout dicts rendered client-side
+# by renderFigure(), laid out the way plotly.express lays them out with the
+# plotly_white template, straight from NumPy arrays. Plotly itself is not
+# imported: no figure object is built or validated, only its template is read.
+
+import base64
+import functools
+import importlib.util
+import json
+import os
+
+from charts import compact_figure
+
+# The plotly_white template as shipped with the plotly Python package
+TEMPLATE_PATH = os.path.join(
+    importlib.util.find_spec('plotly').submodule_search_locations[0], 'package_data', 'templates', 'plotly_white.json'
+)
+
+# plotly.js typed array dtypes of integer arrays, from the smallest, as plotly encodes them
+TYPED_ARRAY_DTYPES = [('i1', 'int8'), ('i2', 'int16'), ('i4', 'int32')]
+
+# plotly.express draws line charts of more points than this with WebGL (render_mode='auto')
+WEBGL_POINTS = 1000
+
+
+@functools.lru_cache(maxsize=None)
+def template():
+    """Return the plotly_white template, compacted by charts.compact_figure() like the rest of a figure."""
+    with open(TEMPLATE_PATH) as f:
+        return compact_figure(json.load(f))
+
+
+def colorway():
+    """Return the trace colors of the template, assigned to traces in order."""
+    return template()['layout']['colorway']
+
+
+def typed_array(values):
+    """
+    Encode integers as a plotly.js typed array, in the smallest dtype holding them like plotly does.
+
+    Args:
+        values (np.ndarray): Integer values.
+
+    Returns:
+        dict or list: {'dtype', 'bdata'} spec, or a list when empty or too large for int32.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.int64)
+    if values.size == 0:
+        return []
+    low, high = values.min(), values.max()
+    for dtype, numpy_dtype in TYPED_ARRAY_DTYPES:
+        info = np.iinfo(numpy_dtype)
+        if info.min <= low and high <= info.max:
+            return {'dtype': dtype, 'bdata': base64.b64encode(values.astype(numpy_dtype).tobytes()).decode('ascii')}
+    return values.tolist()
+
+
+def month_dates(codes):
+    """Return 'YYYY-MM-01' dates of month codes, as Plotly writes monthly x values once compacted."""
+    return [f'{code // 12:04d}-{code % 12 + 1:02d}-01' for code in (int(code) for code in codes)]
+
+
+def _axis(title, anchor):
+    return {'anchor': anchor, 'domain': [0.0, 1.0], 'title': {'text': title}}
+
+
+def _layout(title, xaxis_title, yaxis_title, **layout):
+    return {
+        'legend': {'tracegroupgap': 0},
+        'template': template(),
+        'title': {'text': title, 'x': 0.5},
+        'xaxis': _axis(xaxis_title, 'y'),
+        'yaxis': _axis(yaxis_title, 'x'),
+        **layout,
+    }
+
+
+def _line_trace(x, y, name, hovertemplate, color, showlegend, webgl=False):
+    trace = {
+        'hovertemplate': hovertemplate,
+        'legendgroup': name,
+        'line': {'color': color, 'dash': 'solid'},
+        'marker': {'symbol': 'circle'},
+        'mode': 'lines',
+        'name': name,
+        'orientation': 'v',
+        'showlegend': showlegend,
+        'type': 'scatter',
+        'x': x,
+        'xaxis': 'x',
+        'y': typed_array(y),
+        'yaxis': 'y',
+    }
+    if webgl:
+        trace['type'] = 'scattergl'
+        del trace['orientation']
+    return trace
+
+
+def sales_over_time_figure(months, sales, title):
+    """
+    Build the sales line chart.
+
+    Args:
+        months (np.ndarray): Month codes, for the x-axis.
+        sales (np.ndarray): Sales of each month.
+        title (str): Chart title.
+
+    Returns:
+        dict: {'data': [...], 'layout': {...}}
+    """
+    trace = _line_trace(
+        month_dates(months), sales, '', '%{x|%b %Y}<br>Sales: %{y}', colorway()[0], False, len(months) > WEBGL_POINTS
+    )
+    trace['line']['width'] = 2
+    return {'data': [trace], 'layout': _layout(title, 'Month and Year', 'Number of Cars')}
+
+
+def best_selling_cars_figure(names, sales, title):
+    """
+    Build the best selling cars bar chart.
+
+    Args:
+        names (list): 'Make Model' name of each bar.
+        sales (np.ndarray): Sales of each bar.
+        title (str): Chart title.
+
+    Returns:
+        dict: {'data': [...], 'layout': {...}}
+    """
+    trace = {
+        'hovertemplate': 'Make and Model=%{x}<br>Sales=%{y}<extra></extra>',
+        'legendgroup': '',
+        'marker': {'color': colorway()[0], 'pattern': {'shape': ''}},
+        'name': '',
+        'orientation': 'v',
+        'showlegend': False,
+        'textposition': 'auto',
+        'type': 'bar',
+        'x': list(names),
+        'xaxis': 'x',
+        'y': typed_array(sales),
+        'yaxis': 'y',
+    }
+    return {'data': [trace], 'layout': _layout(title, 'Car Model', 'Number of Cars', barmode='relative')}
+
+
+def province_sales_figure(months, provinces, sales, visible, x_range):
+    """
+    Build the sales by province/territory line chart, one line per province, with a range slider.
+
+    Args:
+        months (np.ndarray): Month codes, for the x-axis.
+        provinces (list): Province names, in legend order.
+        sales (np.ndarray): Sales by month and province, shaped (months, provinces).
+        visible (set): Provinces shown, the others are only listed in the legend.
+        x_range (tuple): First and last month code of the x-axis range shown initially.
+
+    Returns:
+        dict: {'data': [...], 'layout': {...}}
+    """
+    x = month_dates(months)
+    colors = colorway()
+    data = []
+    for i, province in enumerate(provinces):
+        trace = _line_trace(
+            x, sales[:, i], province, '%{fullData.name}<br>%{x|%b %Y}<br>Cars Sold: %{y}<extra></extra>',
+            colors[i % len(colors)], True, sales.size > WEBGL_POINTS,
+        )
+        if province not in visible:
+            trace['visible'] = 'legendonly'
+        data.append(trace)
+
+    layout = _layout('Sales by Province/Territory Over Time', 'Month and Year', 'Number of Cars')
+    layout['legend']['title'] = {'text': 'Province/Territory'}
+    layout['xaxis'].update({
+        'range': month_dates(x_range),
+        'rangeselector': {
+            'buttons': [
+                {'count': 1, 'label': '1y', 'step': 'year', 'stepmode': 'backward'},
+                {'count': 2, 'label': '2y', 'step': 'year', 'stepmode': 'backward'},
+                {'step': 'all'},
+            ]
+        },
+        'rangeslider': {'visible': True},
+        'type': 'date',
+    })
+    return {'data': data, 'layout': layout}
@@ -0,0 +1,181 @@
+# metrics.py
+#
+# Per-request timing of the dashboard routes: stage durations, payload sizes and
+# response cache results, aggregated into histograms and counters served in the
+# Prometheus text format on /metrics. Only the standard library and Flask are
+# imported here.
+
+import bisect
+import contextlib
+import threading
+import time
+
+from flask import Blueprint, Response, current_app, g, has_request_context, request
+
+# Initialize the Blueprint
+metrics_bp = Blueprint('metrics_bp', __name__)
+
+# Histogram bucket upper bounds
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BYTES_BUCKETS = (1_000, 10_000, 30_000, 100_000, 300_000, 1_000_000, 3_000_000, 10_000_000)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Counter:
+    """A counter per label values, e.g. requests per route."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        """Return the (name, label string, value) samples of every label combination."""
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labels, key), value) for key, value in values]
+
+
+class Histogram:
+    """A histogram per label values, with cumulative buckets like Prometheus client histograms."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            counts, total = self._values.get(label_values, (None, 0.0))
+            if counts is None:
+                counts = [0] * (len(self.buckets) + 1)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[label_values] = (counts, total + value)
+
+    def samples(self):
+        """Return the bucket, sum and count samples of every label combination."""
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        samples = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                labels = _format_labels(self.labels + ('le',), key + (bound,))
+                samples.append((f'{self.name}_bucket', labels, cumulative))
+            samples.append((f'{self.name}_sum', _format_labels(self.labels, key), total))
+            samples.append((f'{self.name}_count', _format_labels(self.labels, key), cumulative))
+        return samples
+
+
+REQUEST_SECONDS = Histogram(
+    'izev_request_duration_seconds', 'Time to handle a request.', DURATION_BUCKETS, ('route', 'status'),
+)
+STAGE_SECONDS = Histogram(
+    'izev_stage_duration_seconds', 'Time spent in each stage of a request.', DURATION_BUCKETS, ('route', 'stage'),
+)
+RESPONSE_BYTES = Histogram(
+    'izev_response_bytes', 'Size of response bodies sent, after any content encoding.', BYTES_BUCKETS, ('route',),
+)
+CACHE_REQUESTS = Counter(
+    'izev_response_cache_requests_total', 'Requests to cached routes, by response cache result.', ('route', 'result'),
+)
+
+METRICS = [REQUEST_SECONDS, STAGE_SECONDS, RESPONSE_BYTES, CACHE_REQUESTS]
+
+
+def _route():
+    return request.endpoint or 'none'
+
+
+@contextlib.contextmanager
+def stage(name):
+    """
+    Time a stage of the current request, e.g. `with stage('aggregate'): ...`.
+
+    The duration is added to the stage histogram and, when enabled, to the
+    Server-Timing header of the response. Repeated stages add up. Outside of
+    a request nothing is recorded.
+
+    Args:
+        name (str): Stage name: 'aggregate', 'figure', 'serialize', 'render', ...
+    """
+    if not has_request_context():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, _route(), name)
+        stages = g.setdefault('stages', {})
+        stages[name] = stages.get(name, 0.0) + elapsed
+
+
+def record_cache(result):
+    """Record a response cache 'hit', 'prerendered' artifact or 'miss' for the current request."""
+    CACHE_REQUESTS.inc(_route(), result)
+    g.cache_result = result
+
+
+@metrics_bp.before_app_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+
+@metrics_bp.after_app_request
+def record_request(response):
+    start = g.get('request_start')
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    route = _route()
+    REQUEST_SECONDS.observe(elapsed, route, response.status_code)
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe(response.calculate_content_length() or 0, route)
+
+    if current_app.config.get('SERVER_TIMING', True):
+        timings = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in g.get('stages', {}).items()]
+        if 'cache_result' in g:
+            timings.append(f'cache;desc={g.cache_result}')
+        timings.append(f'total;dur={elapsed * 1000:.2f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+    return response
+
+
+def render_metrics():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(f'{name}{labels} {value}' for name, labels, value in metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+@metrics_bp.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
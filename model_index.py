@@ -0,0 +1,55 @@
+# model_index.py
+
+import numpy as np
+
+
+class ModelIndex:
+    """
+    Per-model sales of a SalesCube, sliced out once so one model is looked up without touching the others.
+
+    Built once per dataset (see data_loader.Dataset). The cube stores vehicles
+    on its last axis, so the sales of one vehicle are scattered across the
+    whole array; here each vehicle's months x provinces x types block is
+    copied out contiguously, and trimmed to start at its first month with sales.
+
+    Attributes:
+        months (np.ndarray): Month codes of the cube.
+        provinces (list): Province/territory names.
+        vehicle_types (list): Vehicle type names.
+        past_year_sales (int): Sales of every vehicle over the latest 12 months, what model shares are of.
+    """
+
+    def __init__(self, cube):
+        self.months = cube.months
+        self.provinces = cube.provinces
+        self.vehicle_types = cube.vehicle_types
+        self._codes = {name: vehicle for vehicle, name in enumerate(cube.vehicle_names())}
+        self.past_year_sales = cube.sum(start=cube.latest_month - 11) if len(cube.months) else 0
+
+        # Step 1: One contiguous block per vehicle, shaped (vehicles, months, provinces, types)
+        self._sales = np.ascontiguousarray(np.moveaxis(cube.counts, 3, 0))
+
+        # Step 2: Offset of the first month with sales of each vehicle
+        has_sales = self._sales.any(axis=(2, 3))
+        self._first_month = np.where(has_sales.any(axis=1), has_sales.argmax(axis=1), len(self.months))
+
+    def __len__(self):
+        return len(self._codes)
+
+    def vehicle(self, make, model):
+        """Return the vehicle code of a make and model, None when there is no such vehicle."""
+        return self._codes.get((make, model))
+
+    def sales(self, vehicle):
+        """
+        Return the sales of one vehicle, from its first month with sales to the latest month in the data.
+
+        Args:
+            vehicle (int): Vehicle code, see vehicle().
+
+        Returns:
+            tuple: (month codes, sales shaped (months, provinces, types)). The sales are a
+                view into the index, not a copy.
+        """
+        first = self._first_month[vehicle]
+        return self.months[first:], self._sales[vehicle, first:]
@@ -0,0 +1,132 @@
+# model_sales.py
+
+from flask import Blueprint, abort, jsonify, render_template
+from response_cache import cached
+from metrics import stage
+
+# Initialize the Blueprint
+model_sales_bp = Blueprint('model_sales_bp', __name__, template_folder='templates')
+
+
+def model_sales_data(models, make, model):
+    """
+    Build the monthly sales of one make and model, by province and by vehicle type.
+
+    Only the model's own slice of the ModelIndex is read, so the cost does not
+    grow with the rest of the dataset.
+
+    Args:
+        models (ModelIndex): Per-model sales.
+        make (str): Vehicle make, e.g. 'Tesla'.
+        model (str): Vehicle model, e.g. 'Model Y'.
+
+    Returns:
+        dict or None: 'make', 'model', 'months' (YYYY-MM, from the first month with sales to the
+            latest month in the data), monthly 'total' sales, 'provinces' and 'vehicle_types' with
+            sales (by past year sales in descending order) with their monthly sales in 'by_province'
+            and 'by_type' (one list per name), and a 'summary' of the latest month and past year
+            sales with the sales_trends() measures, the share being of every model. None for an
+            unknown make and model.
+    """
+    import numpy as np
+    from data_loader import month_label
+    from sales_tables import sales_trends
+
+    vehicle = models.vehicle(make, model)
+    if vehicle is None:
+        return None
+    months, sales = models.sales(vehicle)
+
+    def breakdown(names, sales):
+        # Names with sales, by past year sales, and their monthly sales
+        past_year = sales[-12:].sum(axis=0)
+        kept = np.flatnonzero(sales.sum(axis=0) > 0)
+        kept = kept[np.argsort(-past_year[kept], kind='stable')]
+        return [names[code] for code in kept], sales[:, kept].T.tolist()
+
+    provinces, by_province = breakdown(models.provinces, sales.sum(axis=2))
+    vehicle_types, by_type = breakdown(models.vehicle_types, sales.sum(axis=1))
+    total = sales.sum(axis=(1, 2))
+
+    summary = {
+        'latest_month': month_label(months[-1], '%Y-%m') if len(months) else None,
+        'latest_month_sales': int(total[-1]) if len(total) else 0,
+        'past_year_sales': int(total[-12:].sum()),
+        'total_sales': int(total.sum()),
+    }
+    if len(total):
+        trends = sales_trends(total[np.newaxis], total=models.past_year_sales)
+        summary.update({name: values[0] for name, values in trends.items()})
+
+    return {
+        'make': make,
+        'model': model,
+        # As month_label(code, '%Y-%m'), without a Timestamp per month
+        'months': [f'{code // 12:04d}-{code % 12 + 1:02d}' for code in months.tolist()],
+        'total': total.tolist(),
+        'provinces': provinces,
+        'by_province': by_province,
+        'vehicle_types': vehicle_types,
+        'by_type': by_type,
+        'summary': summary,
+    }
+
+
+@model_sales_bp.route('/model/<make>/<model>')
+@cached()
+def model_sales(make, model):
+    # The data layer is imported on first use, so the app starts without it (see warmup.py)
+    import numpy as np
+    from data_loader import get_dataset, month_label
+    from figures import province_sales_figure, sales_over_time_figure
+
+    models = get_dataset().models
+    with stage('aggregate'):
+        data = model_sales_data(models, make, model)
+    if data is None:
+        abort(404)
+
+    with stage('figure'):
+        months, sales = models.sales(models.vehicle(make, model))
+        sales_graph = province_graph = None
+        if len(months):
+            sales_graph = sales_over_time_figure(
+                months, np.asarray(data['total']), f'Total Sales Over Time for {make} {model}'
+            )
+            # Provinces in legend order by latest month sales, the top 4 shown, as on the home page
+            by_province = np.asarray(data['by_province']).T
+            order = np.argsort(-by_province[-1], kind='stable')
+            provinces = [data['provinces'][code] for code in order]
+            province_graph = province_sales_figure(
+                months, provinces, by_province[:, order], set(provinces[:4]), (months[-1] - 12, months[-1])
+            )
+
+    # Table rows: latest month and past year sales per province and per vehicle type
+    def rows(names, sales):
+        return [
+            {'name': name, 'latest_month': monthly[-1], 'past_year': sum(monthly[-12:]), 'total': sum(monthly)}
+            for name, monthly in zip(names, sales)
+        ]
+
+    with stage('render'):
+        return render_template('model_sales/model_sales.html',
+                               data=data,
+                               summary=data['summary'],
+                               latest_month=month_label(months[-1], '%B %Y') if len(months) else None,
+                               province_rows=rows(data['provinces'], data['by_province']),
+                               type_rows=rows(data['vehicle_types'], data['by_type']),
+                               sales_graph=sales_graph,
+                               province_graph=province_graph)
+
+
+@model_sales_bp.route('/model/<make>/<model>/data')
+@cached()
+def model_sales_json(make, model):
+    from data_loader import get_dataset
+
+    with stage('aggregate'):
+        data = model_sales_data(get_dataset().models, make, model)
+    if data is None:
+        return jsonify({'error': f"Unknown make and model '{make} {model}'"}), 404
+    with stage('serialize'):
+        return jsonify(data)
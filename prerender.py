@@ -0,0 +1,226 @@
+# prerender.py
+#
+# Renders every page and AJAX payload of the dashboard, for every filter
+# combination, to gzip-compressed files at build time (`flask --app app prerender`).
+# Cached routes serve these artifacts while they match both the loaded dataset
+# version and the code that rendered them (see build_fingerprint), and only
+# compute the response live for anything else.
+#
+# Artifacts are laid out as <directory>/<version>/<route>/<query>.<ext>.gz, e.g.
+# prerendered/<version>/brand_sales/vehicle_type=BEV&province=Quebec.html.gz,
+# with <query> 'all' for no filters, so a static web server can serve them too.
+
+import functools
+import glob
+import gzip
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+# Directory holding the artifacts and their manifest, overridable with IZEV_PRERENDER_DIR
+PRERENDER_DIR = os.environ.get('IZEV_PRERENDER_DIR', 'prerendered')
+
+MANIFEST_FILE = 'manifest.json'
+
+# Panels the home page requests from /panels when the vehicle type changes (see index.html)
+HOME_PAGE_PANELS = 'sales_over_time,best_sellers,province_table,province_chart'
+
+# File extension of each artifact media type
+EXTENSIONS = {'text/html': '.html', 'application/json': '.json'}
+
+# Files the responses are rendered from, relative to the app directory
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_PATTERNS = ('*.py', 'templates/**/*.html')
+
+# Manifest loaded from PRERENDER_DIR, reloaded when the file changes
+_manifest = {'stat': None, 'version': None, 'fingerprint': None, 'entries': {}}
+_manifest_lock = threading.Lock()
+
+
+def artifact_key(path, params=()):
+    """
+    Return the key of the artifact for a request: its path and filter parameters.
+
+    Args:
+        path (str): Request path, e.g. '/brand_sales'.
+        params: (name, value) pairs in route order, 'All' values are left out.
+
+    Returns:
+        str: e.g. '/brand_sales?vehicle_type=BEV&province=Quebec'.
+    """
+    query = urlencode([(name, value) for name, value in params if value != 'All'])
+    return f'{path}?{query}' if query else path
+
+
+@functools.lru_cache(maxsize=None)
+def build_fingerprint():
+    """
+    Return a hash of the code responses are rendered from: the app modules and templates, and the plotly version.
+
+    Artifacts record the fingerprint of the build that rendered them, and are
+    only served by an app with the same one, so a deploy changing any of these
+    does not serve responses rendered by the previous code.
+
+    Returns:
+        str: Short content hash.
+    """
+    digest = hashlib.sha256(importlib.metadata.version('plotly').encode())
+    files = sorted({
+        path for pattern in SOURCE_PATTERNS for path in glob.glob(os.path.join(APP_DIR, pattern), recursive=True)
+    })
+    for path in files:
+        digest.update(os.path.relpath(path, APP_DIR).encode() + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def artifact_requests(cube):
+    """
+    Return every (path, params) request prerendered: each page and AJAX payload for every filter combination.
+
+    Args:
+        cube (SalesCube): Aggregated sales, for the vehicle types and provinces.
+
+    Returns:
+        list: (path, list of (name, value) pairs) tuples.
+    """
+    vehicle_types = ['All'] + cube.vehicle_types
+    provinces = ['All'] + cube.provinces
+    requests = [('/', [])]
+    for path in ('/update_graph', '/get_province_sales_data'):
+        requests += [(path, [('vehicle_type', t)]) for t in vehicle_types]
+    # The panels requested by the home page when the vehicle type changes
+    requests += [('/panels', [('vehicle_type', t), ('panels', HOME_PAGE_PANELS)]) for t in vehicle_types]
+    for path in ('/brand_sales', '/brand_sales/data'):
+        requests += [(path, [('vehicle_type', t), ('province', p)]) for t in vehicle_types for p in provinces]
+    return requests
+
+
+def _artifact_file(path, params, mimetype):
+    route = path.strip('/') or 'index'
+    query = urlencode([(name, value) for name, value in params if value != 'All']) or 'all'
+    return os.path.join(route, query + EXTENSIONS.get(mimetype, '') + '.gz')
+
+
+def build(app, directory=PRERENDER_DIR):
+    """
+    Render every artifact_requests() response of the loaded dataset to `directory`.
+
+    The artifacts are written to a new <directory>/<version> directory, then
+    the manifest is replaced, so running servers switch over at once. The
+    directory of the version the previous manifest listed and the staging
+    directories of failed builds are removed, nothing else in `directory` is.
+
+    Args:
+        app (Flask): The application.
+        directory (str): Output directory.
+
+    Returns:
+        dict: The manifest written.
+    """
+    from data_loader import get_dataset
+
+    dataset = get_dataset()
+    os.makedirs(directory, exist_ok=True)
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            previous = json.load(f)['version']
+    except (OSError, ValueError, KeyError):
+        previous = None
+    staging = tempfile.mkdtemp(prefix='.build-', dir=directory)
+
+    entries = {}
+    client = app.test_client()
+    # Render every response live, not from the artifacts of a previous build
+    prerendered = app.config.get('PRERENDERED', True)
+    app.config['PRERENDERED'] = False
+    try:
+        responses = [
+            (path, params, client.get(path, query_string=params, headers={'Accept-Encoding': 'identity'}))
+            for path, params in artifact_requests(dataset.cube)
+        ]
+    finally:
+        app.config['PRERENDERED'] = prerendered
+
+    for path, params, response in responses:
+        if response.status_code != 200:
+            raise RuntimeError(f"{artifact_key(path, params)} returned {response.status_code}")
+        body = response.get_data()
+        file = _artifact_file(path, params, response.mimetype)
+        os.makedirs(os.path.join(staging, os.path.dirname(file)), exist_ok=True)
+        with open(os.path.join(staging, file), 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=9, mtime=0))
+        entries[artifact_key(path, params)] = {'file': file, 'mimetype': response.mimetype, 'bytes': len(body)}
+
+    # mkdtemp() and NamedTemporaryFile() create owner-only files, artifacts are served to anyone
+    target = os.path.join(directory, dataset.version)
+    os.chmod(staging, 0o755)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+
+    manifest = {
+        'version': dataset.version,
+        'fingerprint': build_fingerprint(),
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'entries': entries,
+    }
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.json', delete=False) as f:
+        json.dump(manifest, f, indent=1)
+    os.chmod(f.name, 0o644)
+    os.replace(f.name, os.path.join(directory, MANIFEST_FILE))
+
+    # Only remove what builds create: the previous version and left over staging directories
+    for name in os.listdir(directory):
+        if (name == previous and name != dataset.version) or name.startswith('.build-'):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return manifest
+
+
+def _load_manifest(directory):
+    """Return the manifest of `directory`, re-reading it when the file changed."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    with _manifest_lock:
+        if _manifest['stat'] != key:
+            with open(path) as f:
+                manifest = json.load(f)
+            _manifest.update(
+                stat=key, version=manifest['version'], fingerprint=manifest.get('fingerprint'), entries=manifest['entries']
+            )
+        return dict(_manifest)
+
+
+def find_artifact(key, version, directory=PRERENDER_DIR):
+    """
+    Return the prerendered artifact of a request, if one was built for this dataset version by this code.
+
+    Args:
+        key (str): See artifact_key().
+        version (str): Version of the loaded dataset.
+        directory (str): Artifact directory.
+
+    Returns:
+        tuple or None: (gzip-compressed body, mimetype), None when there is no such artifact.
+    """
+    manifest = _load_manifest(directory)
+    if manifest is None or manifest['version'] != version or manifest['fingerprint'] != build_fingerprint():
+        return None
+    entry = manifest['entries'].get(key)
+    if entry is None:
+        return None
+    try:
+        with open(os.path.join(directory, version, entry['file']), 'rb') as f:
+            return f.read(), entry['mimetype']
+    except FileNotFoundError:
+        return None
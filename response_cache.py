@@ -0,0 +1,263 @@
+# response_cache.py
+
+import functools
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+from flask import Response, current_app, make_response, request
+from metrics import record_cache
+from prerender import artifact_key, find_artifact
+
+try:
+    import brotli
+except ImportError:  # Optional, responses are only gzip-compressed without it
+    brotli = None
+
+# Most responses kept at once, the least recently used are evicted first
+MAX_ENTRIES = 256
+
+# Bodies smaller than this are sent as is, compressing them saves next to nothing
+MIN_COMPRESS_BYTES = 1024
+
+# Content codings every cached body is compressed to, in order of preference
+ENCODINGS = {'gzip': lambda body: gzip.compress(body, compresslevel=9, mtime=0)}
+if brotli is not None:
+    ENCODINGS = {'br': lambda body: brotli.compress(body, quality=9), **ENCODINGS}
+
+
+class CachedResponse:
+    """
+    A rendered response body, its compressed bodies and the validators sent with them.
+
+    Bodies are compressed to every ENCODINGS coding once, when the response is
+    cached, so requests only pick the encoded body the client accepts.
+
+    Args:
+        body (bytes): Uncompressed body.
+        mimetype (str): Media type.
+        last_modified (datetime): Modification time of the dataset.
+        encoded (dict): Already compressed bodies by content coding, e.g. a prerendered
+            {'gzip': ...}, the other codings are compressed here.
+    """
+
+    def __init__(self, body, mimetype, last_modified, encoded=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.last_modified = last_modified
+        self.encoded = dict(encoded or {})
+        if len(body) >= MIN_COMPRESS_BYTES:
+            for coding, compress in ENCODINGS.items():
+                if coding not in self.encoded:
+                    self.encoded[coding] = compress(body)
+
+
+class ResponseCache:
+    """
+    Thread-safe, bounded LRU cache of rendered responses.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to render the response.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.version = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the entry cached under `key` and mark it as recently used, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """Cache `entry` under `key`, evicting the least recently used entries over the limit."""
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def sync(self, version):
+        """Drop every cached entry when the dataset version changed, they can never be hit again."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def stats(self):
+        """Return the entry count and hit/miss counters."""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+# Process-wide cache shared by every cached route
+response_cache = ResponseCache()
+
+
+def request_params():
+    """
+    Return the parameters of the current request.
+
+    Filters may be sent as a JSON body, form fields or the query string. A
+    JSON body that is not an object holds no parameters.
+
+    Returns:
+        dict-like: Parameter names to values.
+    """
+    if request.is_json:
+        params = request.get_json(silent=True)
+        return params if isinstance(params, dict) else {}
+    return request.values
+
+
+def filter_param(name):
+    """
+    Return a filter parameter of the current request, normalized the way cache keys are.
+
+    Args:
+        name (str): Parameter name, e.g. 'vehicle_type' or 'province'.
+
+    Returns:
+        str: The stripped value, 'All' when missing or empty.
+    """
+    value = str(request_params().get(name) or '').strip()
+    return value or 'All'
+
+
+def filter_values(name):
+    """
+    Return a multi-valued filter parameter of the current request.
+
+    Values may be repeated parameters (?make=Tesla&make=Ford) or a JSON list.
+
+    Args:
+        name (str): Parameter name, e.g. 'make' or 'province'.
+
+    Returns:
+        tuple: The stripped, distinct values in request order, ('All',) when
+            missing, empty or when any of them is 'All'.
+    """
+    params = request_params()
+    if hasattr(params, 'getlist'):
+        values = params.getlist(name)
+    else:
+        value = params.get(name)
+        values = value if isinstance(value, list) else [value]
+    values = tuple(dict.fromkeys(str(value).strip() for value in values if value is not None))
+    values = tuple(value for value in values if value)
+    return values if values and 'All' not in values else ('All',)
+
+
+def encoded_response(entry):
+    """
+    Build the response of a CachedResponse in the content coding preferred by the Accept-Encoding of the client.
+
+    Args:
+        entry (CachedResponse): Body to send.
+
+    Returns:
+        Response: With the ETag of the encoding sent and Last-Modified, varying on
+            Accept-Encoding when the body has encodings.
+    """
+    coding = request.accept_encodings.best_match(list(entry.encoded), 'identity')
+    if coding in entry.encoded:
+        response = Response(entry.encoded[coding], mimetype=entry.mimetype)
+        response.content_encoding = coding
+        # Each encoding of the body is validated separately
+        response.set_etag(f'{entry.etag}-{coding}')
+    else:
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+    if entry.encoded:
+        response.vary.add('Accept-Encoding')
+    response.last_modified = entry.last_modified
+    return response
+
+
+def cached(*params, multi=()):
+    """
+    Cache a view's response per route, normalized filter parameters and dataset version.
+
+    Parameters are part of the key exactly as the view reads them: with
+    filter_param() for single-valued ones, so only the first value of a
+    repeated parameter counts, and with filter_values() for those listed in
+    `multi`. Parameters missing from the request default to 'All'. Responses carry an ETag and
+    Last-Modified and must be revalidated, so repeat requests from a browser
+    are answered with 304 Not Modified.
+
+    Bodies are compressed once when cached, and sent in the content coding
+    preferred by the Accept-Encoding of the client (brotli when installed, then
+    gzip), each encoding with its own ETag.
+
+    On a cache miss, the artifact prerendered for the request and dataset
+    version is used when there is one (see prerender.py), the view is only
+    called otherwise. Setting PRERENDERED to False in the app config turns the
+    artifacts off.
+
+    Args:
+        *params (str): Names of the request parameters the response depends on.
+        multi (tuple): Those of `params` the view reads with filter_values().
+    """
+    def values(name):
+        return filter_values(name) if name in multi else (filter_param(name),)
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            # Imported on first use, so the app starts without the data layer (see warmup.py)
+            from data_loader import get_dataset
+
+            dataset = get_dataset()
+            response_cache.sync(dataset.version)
+            key = (
+                request.endpoint,
+                tuple(sorted(kwargs.items())),
+                tuple(values(name) for name in params),
+                dataset.version,
+            )
+
+            entry = response_cache.get(key)
+            if entry is not None:
+                record_cache('hit')
+            else:
+                artifact = None
+                if current_app.config.get('PRERENDERED', True):
+                    artifact = find_artifact(
+                        artifact_key(request.path, [(name, value) for name in params for value in values(name)]),
+                        dataset.version,
+                    )
+                if artifact is not None:
+                    record_cache('prerendered')
+                    gzipped, mimetype = artifact
+                    entry = CachedResponse(gzip.decompress(gzipped), mimetype, dataset.modified, {'gzip': gzipped})
+                else:
+                    record_cache('miss')
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    entry = CachedResponse(response.get_data(), response.mimetype, dataset.modified)
+                response_cache.put(key, entry)
+
+            response = encoded_response(entry)
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
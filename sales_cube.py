@@ -0,0 +1,303 @@
+# sales_cube.py
+
+import numpy as np
+import pandas as pd
+
+# Axes of SalesCube.counts, in storage order. 'make' is not stored, it is
+# derived by grouping the vehicle (make and model) axis.
+AXES = ('month', 'province', 'type', 'vehicle')
+GROUP_BY = ('month', 'province', 'type', 'make', 'vehicle')
+
+# DataFrame columns the cube is built from
+CUBE_COLUMNS = ['Month', 'Province/Territory', 'Vehicle Type', 'Vehicle Make', 'Vehicle Model', 'Number of Cars']
+
+
+def _selection(names, value):
+    """
+    Translate a filter value into sorted codes along one axis.
+
+    Args:
+        names (list): Labels of the axis.
+        value: None or 'All' for no filter, a label, or a list of labels.
+
+    Returns:
+        np.ndarray or None: Selected codes, None when the axis is not filtered.
+    """
+    if value is None or value == 'All':
+        return None
+    values = [value] if isinstance(value, str) else list(value)
+    lookup = {name: code for code, name in enumerate(names)}
+    return np.array(sorted({lookup[v] for v in values if v in lookup}), dtype=np.intp)
+
+
+def _factorize(values):
+    """
+    Encode a column as codes into its sorted distinct values.
+
+    Categorical columns are encoded from their existing codes in a single
+    pass; categories without any rows are dropped.
+
+    Args:
+        values (pd.Series): Column to encode.
+
+    Returns:
+        tuple: (codes as np.ndarray, list of names)
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        codes, names = pd.factorize(values, sort=True)
+        return codes, [str(name) for name in names]
+
+    codes = values.cat.codes.to_numpy()
+    categories = np.asarray(values.cat.categories, dtype=object)
+    present = np.flatnonzero(np.bincount(codes, minlength=len(categories)))
+    present = present[np.argsort(categories[present].astype(str), kind='stable')]
+    recode = np.full(len(categories), -1, dtype=np.intp)
+    recode[present] = np.arange(len(present))
+    return recode[codes], [str(name) for name in categories[present]]
+
+
+class SalesCube:
+    """
+    Dense array of car sales indexed by month, province, vehicle type and vehicle.
+
+    A vehicle is one make and model pair. Vehicles are sorted by make then
+    model, so the vehicles of a make occupy a contiguous run of codes and
+    sums per make are a single reduction over that axis.
+
+    Attributes:
+        months (np.ndarray): Month period codes (see data_loader.month_code), contiguous and ascending.
+        provinces (list): Province/territory names.
+        vehicle_types (list): Vehicle type names.
+        makes (list): Vehicle make names.
+        vehicle_make (np.ndarray): Make code of each vehicle.
+        vehicle_models (list): Model name of each vehicle.
+        counts (np.ndarray): Sales, shape (months, provinces, types, vehicles).
+    """
+
+    def __init__(self, df):
+        if df.empty:
+            # No data loaded, every query sums to zero
+            df = pd.DataFrame({column: pd.Series(dtype='int16') for column in CUBE_COLUMNS})
+
+        month_codes = df['Month'].to_numpy()
+        if len(month_codes):
+            self.months = np.arange(month_codes.min(), month_codes.max() + 1)
+        else:
+            self.months = np.arange(0)
+
+        province_codes, self.provinces = _factorize(df['Province/Territory'])
+        type_codes, self.vehicle_types = _factorize(df['Vehicle Type'])
+        make_codes, self.makes = _factorize(df['Vehicle Make'])
+        model_codes, models = _factorize(df['Vehicle Model'])
+
+        # Number the distinct make/model pairs, ordered by make then model
+        pair_codes = make_codes * len(models) + model_codes
+        pairs = np.flatnonzero(np.bincount(pair_codes, minlength=len(self.makes) * len(models)))
+        vehicle_codes = np.zeros(len(self.makes) * len(models), dtype=np.intp)
+        vehicle_codes[pairs] = np.arange(len(pairs))
+        self.vehicle_make = pairs // max(len(models), 1)
+        self.vehicle_models = [models[code] for code in pairs % max(len(models), 1)]
+
+        shape = (len(self.months), len(self.provinces), len(self.vehicle_types), len(pairs))
+        first_month = self.months[0] if len(self.months) else 0
+        flat_index = np.ravel_multi_index(
+            (month_codes - first_month, province_codes, type_codes, vehicle_codes[pair_codes]), shape
+        )
+        self.counts = np.bincount(
+            flat_index, weights=df['Number of Cars'].to_numpy(), minlength=int(np.prod(shape))
+        ).astype(np.int32).reshape(shape)
+
+    def combine(self, other):
+        """
+        Return a new cube holding the sales of this cube plus those of `other`.
+
+        The axes of the result are the union of both cubes' axes, so `other`
+        may add months, provinces, vehicle types or vehicles. The cost depends
+        on the size of the cubes, not on the number of rows they were built
+        from; neither cube is modified.
+
+        Args:
+            other (SalesCube): Cube to add, typically built from newly ingested rows.
+
+        Returns:
+            SalesCube: The combined cube.
+        """
+        cubes = [cube for cube in (self, other) if len(cube.months)]
+        if len(cubes) < 2:
+            return cubes[0] if cubes else self
+
+        combined = SalesCube.__new__(SalesCube)
+        combined.months = np.arange(
+            min(cube.months[0] for cube in cubes), max(cube.months[-1] for cube in cubes) + 1
+        )
+        combined.provinces = sorted(set(self.provinces) | set(other.provinces))
+        combined.vehicle_types = sorted(set(self.vehicle_types) | set(other.vehicle_types))
+        combined.makes = sorted(set(self.makes) | set(other.makes))
+        vehicles = sorted(set(self.vehicle_names()) | set(other.vehicle_names()))
+        make_codes = {name: code for code, name in enumerate(combined.makes)}
+        combined.vehicle_make = np.array([make_codes[make] for make, _ in vehicles], dtype=np.intp)
+        combined.vehicle_models = [model for _, model in vehicles]
+
+        combined.counts = np.zeros(
+            (len(combined.months), len(combined.provinces), len(combined.vehicle_types), len(vehicles)),
+            dtype=np.int32,
+        )
+        vehicle_codes = {name: code for code, name in enumerate(vehicles)}
+        for cube in cubes:
+            # Position of each of this cube's labels along the combined axes
+            index = np.ix_(
+                cube.months - combined.months[0],
+                [combined.provinces.index(name) for name in cube.provinces],
+                [combined.vehicle_types.index(name) for name in cube.vehicle_types],
+                [vehicle_codes[name] for name in cube.vehicle_names()],
+            )
+            combined.counts[index] += cube.counts
+        return combined
+
+    def check_filters(self, vehicle_type=None, province=None):
+        """
+        Check that vehicle type and province filters only name labels of the cube.
+
+        sum() ignores unknown names, so a typo would silently select nothing.
+
+        Args:
+            vehicle_type: Vehicle type filter, see sum().
+            province: Province/territory filter, see sum().
+
+        Raises:
+            ValueError: For an unknown vehicle type or province.
+        """
+        for name, value, names in (('vehicle_type', vehicle_type, self.vehicle_types),
+                                   ('province', province, self.provinces)):
+            if value is None or value == 'All':
+                continue
+            for label in [value] if isinstance(value, str) else value:
+                if label not in names:
+                    raise ValueError(f"Unknown {name} '{label}', expected All or any of {', '.join(names)}")
+
+    @property
+    def latest_month(self):
+        """int: Code of the last month in the data."""
+        return int(self.months[-1])
+
+    def month_codes(self, start=None, end=None):
+        """
+        Return the month codes covered by an inclusive month range, clipped to the data.
+
+        Args:
+            start (int): First month code, None for the first month in the data.
+            end (int): Last month code, None for the last month in the data.
+
+        Returns:
+            np.ndarray: Month codes, ascending.
+        """
+        return self.months[self._month_slice(start, end)]
+
+    def _month_slice(self, start, end):
+        first = int(self.months[0]) if len(self.months) else 0
+        lo = 0 if start is None else max(int(start) - first, 0)
+        hi = len(self.months) if end is None else max(int(end) - first + 1, 0)
+        return slice(lo, hi)
+
+    def vehicle_names(self, vehicles=None):
+        """
+        Return (make, model) names for vehicle codes.
+
+        Args:
+            vehicles: Iterable of vehicle codes, None for every vehicle.
+
+        Returns:
+            list: (make, model) tuples.
+        """
+        if vehicles is None:
+            vehicles = range(len(self.vehicle_models))
+        return [(self.makes[self.vehicle_make[v]], self.vehicle_models[v]) for v in vehicles]
+
+    def _vehicle_selection(self, make, model):
+        make_codes = _selection(self.makes, make)
+        selected = None
+        if make_codes is not None:
+            selected = np.flatnonzero(np.isin(self.vehicle_make, make_codes))
+        if model is not None and model != 'All':
+            models = {model} if isinstance(model, str) else set(model)
+            by_model = np.array(
+                [code for code, name in enumerate(self.vehicle_models) if name in models], dtype=np.intp
+            )
+            selected = by_model if selected is None else np.intersect1d(selected, by_model)
+        return selected
+
+    def sum(self, by=(), vehicle_type=None, province=None, make=None, model=None, start=None, end=None):
+        """
+        Sum sales over every axis not listed in `by`.
+
+        Filters take a name, a list of names, or None/'All' for no filter. The
+        month range is inclusive and clipped to the months in the data.
+
+        Args:
+            by (tuple): Axes to keep, in output order. Any of 'month', 'province', 'type', 'make' and 'vehicle'
+                (not both, a vehicle belongs to exactly one make).
+            vehicle_type: Vehicle type filter.
+            province: Province/territory filter.
+            make: Vehicle make filter.
+            model: Vehicle model filter.
+            start (int): First month code.
+            end (int): Last month code.
+
+        Returns:
+            np.ndarray or int: Sales with one dimension per entry of `by`, an int when `by` is empty.
+                Month dimensions cover month_codes(start, end), other dimensions cover every label of
+                their axis, filtered or not.
+        """
+        for axis in by:
+            if axis not in GROUP_BY:
+                raise ValueError(f"Unknown axis '{axis}'")
+        if 'make' in by and 'vehicle' in by:
+            raise ValueError("Group by 'vehicle' already identifies the make")
+
+        counts = self.counts[self._month_slice(start, end)]
+        province_codes = _selection(self.provinces, province)
+        type_codes = _selection(self.vehicle_types, vehicle_type)
+        vehicles = self._vehicle_selection(make, model)
+
+        # Filter each axis, keeping the full axis length only where it is grouped on
+        for axis, codes in ((1, province_codes), (2, type_codes)):
+            if codes is not None:
+                counts = self._filter_axis(counts, axis, codes, AXES[axis] in by)
+
+        group_vehicles = 'vehicle' in by or 'make' in by
+        if vehicles is not None:
+            counts = self._filter_axis(counts, 3, vehicles, group_vehicles)
+
+        kept = [axis for axis in AXES if axis in by or (axis == 'vehicle' and group_vehicles)]
+        dropped = tuple(i for i, axis in enumerate(AXES) if axis not in kept)
+        result = counts.sum(axis=dropped) if dropped else counts
+
+        if 'make' in by:
+            result = self._sum_by_make(result, kept.index('vehicle'))
+            kept[kept.index('vehicle')] = 'make'
+
+        result = np.transpose(result, [kept.index(axis) for axis in by])
+        return int(result) if not by else result
+
+    @staticmethod
+    def _filter_axis(counts, axis, codes, keep_length):
+        selected = np.take(counts, codes, axis=axis)
+        if not keep_length:
+            return selected
+        # Scatter back so output codes still line up with the axis labels
+        full = np.zeros(counts.shape, dtype=counts.dtype)
+        index = [slice(None)] * counts.ndim
+        index[axis] = codes
+        full[tuple(index)] = selected
+        return full
+
+    def _sum_by_make(self, values, axis):
+        """Replace the vehicle axis of `values` with sums per make."""
+        values = np.moveaxis(values, axis, -1)
+        makes = self.vehicle_make
+        by_make = np.zeros(values.shape[:-1] + (len(self.makes),), dtype=values.dtype)
+        if len(makes):
+            # Vehicles are sorted by make, so each make is one contiguous run
+            starts = np.flatnonzero(np.r_[True, makes[1:] != makes[:-1]])
+            by_make[..., makes[starts]] = np.add.reduceat(values, starts, axis=-1)
+        return np.moveaxis(by_make, -1, axis)
@@ -0,0 +1,138 @@
+# sales_tables.py
+
+import numpy as np
+
+from data_loader import month_label
+
+
+def sales_trends(sales, latest=None, total=None, rows=None):
+    """
+    Compute rolling averages, year-over-year growth and market share of sales rows.
+
+    Every window is a difference of cumulative sums over the month axis, so
+    each measure costs one subtraction per row whatever its window.
+
+    Args:
+        sales (np.ndarray): One row per make, model or province, one column per month,
+            consecutive and oldest first.
+        latest (int): Column of the latest month, the last column by default.
+        total (int): Past year sales the shares are of, the sum over every row by default.
+        rows (np.ndarray): Rows to return, every row by default.
+
+    Returns:
+        dict: Lists with a value per row: 'avg_3_months' and 'avg_12_months' (average monthly
+            sales up to the latest month, 1 decimal), 'yoy_growth' (percent change of the latest
+            month from the same month a year earlier, 1 decimal, None without sales then) and
+            'share' (percent of `total` over the past year, 1 decimal).
+    """
+    sales = np.asarray(sales, dtype=np.int64)
+    latest = sales.shape[1] - 1 if latest is None else latest
+
+    cumulative = np.zeros((sales.shape[0], sales.shape[1] + 1), dtype=np.int64)
+    np.cumsum(sales, axis=1, out=cumulative[:, 1:])
+
+    def average(months):
+        first = max(latest + 1 - months, 0)
+        return (cumulative[:, latest + 1] - cumulative[:, first]) / (latest + 1 - first)
+
+    past_year = cumulative[:, latest + 1] - cumulative[:, max(latest - 11, 0)]
+    total = int(past_year.sum()) if total is None else total
+    current = sales[:, latest]
+    previous = sales[:, latest - 12] if latest >= 12 else np.zeros_like(current)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.round((current - previous) / previous * 100, 1)
+    share = np.round(past_year / total * 100, 1) if total else np.zeros(len(sales))
+
+    rows = slice(None) if rows is None else rows
+    return {
+        'avg_3_months': np.round(average(3), 1)[rows].tolist(),
+        'avg_12_months': np.round(average(12), 1)[rows].tolist(),
+        'yoy_growth': [
+            value if known else None for value, known in zip(growth[rows].tolist(), (previous[rows] > 0).tolist())
+        ],
+        'share': share[rows].tolist(),
+    }
+
+
+def province_sales_table(cube, vehicle_type='All', pivot=None):
+    """
+    Build the Sales Summary table shown on the home page.
+
+    The Canada row and every province/territory row come from one pivot of
+    the cube over (province, month). The last 6 months, YTD and 1 year
+    columns are column slices and sums of that pivot.
+
+    Args:
+        cube (SalesCube): Aggregated sales.
+        vehicle_type (str): Vehicle type to filter on, 'All' for every type.
+        pivot (np.ndarray): Sales by province and month for the vehicle type, when
+            already summed, see app.dashboard_panels().
+
+    Returns:
+        dict: 'table_data' rows (Canada first, then provinces/territories sorted
+            by latest month sales, with the sales_trends() measures, shares being of
+            Canada), 'last_6_months_labels', and the tooltip ranges
+            'total_last_6_months_range', 'ytd_range' and 'one_year_range'. Rows,
+            labels and ranges are empty when the cube has no months.
+    """
+    if pivot is None:
+        pivot = cube.sum(by=('province', 'month'), vehicle_type=vehicle_type)
+    canada = pivot.sum(axis=0)
+
+    # Latest month and last 6 months with sales for the selected vehicle type, the
+    # latest months in the data when it has none (only the Canada row is shown then)
+    month_offsets = np.flatnonzero(canada > 0)
+    if not len(month_offsets):
+        month_offsets = np.arange(len(cube.months))
+    if not len(month_offsets):
+        return {
+            'table_data': [],
+            'last_6_months_labels': [],
+            'total_last_6_months_range': '',
+            'ytd_range': '',
+            'one_year_range': '',
+        }
+    latest = int(month_offsets[-1])
+    last_6_offsets = month_offsets[-6:][::-1]
+    latest_month = int(cube.months[latest])
+
+    # YTD starts in January of the latest year, 1 year covers the latest 12 months
+    ytd_start = max(latest - latest_month % 12, 0)
+    one_year_start = max(latest - 11, 0)
+
+    # Canada row first, then provinces/territories sorted by latest month sales
+    provinces = np.argsort(-pivot[:, latest], kind='stable')
+    provinces = provinces[pivot[provinces, latest] > 0]
+    rows = np.vstack([canada, pivot[provinces]])
+    names = ['Canada'] + [cube.provinces[code] for code in provinces]
+
+    last_6_months = rows[:, last_6_offsets]
+    total_last_6_months = last_6_months.sum(axis=1)
+    ytd = rows[:, ytd_start:latest + 1].sum(axis=1)
+    one_year = rows[:, one_year_start:latest + 1].sum(axis=1)
+    trends = sales_trends(rows, latest, total=int(one_year[0]))
+
+    table_data = [
+        {
+            'Priority': 0 if i == 0 else 1,
+            'Province': name,
+            'Last 6 Months': last_6_months[i].tolist(),
+            'Total Last 6 Months': int(total_last_6_months[i]),
+            'YTD': int(ytd[i]),
+            '1 Year': int(one_year[i]),
+            '3 Month Avg': trends['avg_3_months'][i],
+            '12 Month Avg': trends['avg_12_months'][i],
+            'YoY Growth': trends['yoy_growth'][i],
+            'Market Share': trends['share'][i],
+        }
+        for i, name in enumerate(names)
+    ]
+
+    last_6_months_labels = [month_label(cube.months[offset]) for offset in last_6_offsets]
+    return {
+        'table_data': table_data,
+        'last_6_months_labels': last_6_months_labels,
+        'total_last_6_months_range': f"{last_6_months_labels[-1]} - {last_6_months_labels[0]}",
+        'ytd_range': f"{month_label(latest_month - latest_month % 12)} - {month_label(latest_month)}",
+        'one_year_range': f"{month_label(latest_month - 12)} - {month_label(latest_month)}",
+    }
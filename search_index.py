@@ -0,0 +1,158 @@
+# search_index.py
+
+import bisect
+import unicodedata
+
+import numpy as np
+
+# Results returned by SearchIndex.search() by default
+SEARCH_LIMIT = 10
+
+# Lowest trigram similarity of a fuzzy match, from 0 to 1
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text):
+    """
+    Normalize a name or query for matching: case-folded, without accents, punctuation or extra spaces.
+
+    Args:
+        text (str): e.g. 'Mercedes-Benz EQB'.
+
+    Returns:
+        str: e.g. 'mercedes benz eqb'.
+    """
+    text = unicodedata.normalize('NFKD', text).casefold()
+    text = ''.join(c if c.isalnum() else ' ' for c in text if not unicodedata.combining(c))
+    return ' '.join(text.split())
+
+
+def trigrams(text):
+    """Return the trigrams of normalized `text`, padded so that word starts weigh more."""
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """
+    Prefix and trigram index over the make and model names of a SalesCube, with the sales of each.
+
+    Built once per dataset (see data_loader.Dataset), so a search only looks up
+    the index and the sales totals, without touching the rows.
+
+    Attributes:
+        makes (list): Make name of each vehicle code.
+        models (list): Model name of each vehicle code.
+        latest_month (int): Code of the latest month in the data, None without data.
+        latest_month_sales (np.ndarray): Sales of each vehicle in the latest month.
+        past_year_sales (np.ndarray): Sales of each vehicle over the latest 12 months.
+    """
+
+    def __init__(self, cube):
+        names = cube.vehicle_names()
+        self.makes = [make for make, _ in names]
+        self.models = [model for _, model in names]
+        self._names = [normalize(f'{make} {model}') for make, model in names]
+
+        # Sales totals per vehicle, looked up by every search
+        if len(cube.months):
+            self.latest_month = cube.latest_month
+            self.latest_month_sales = cube.sum(by=('vehicle',), start=self.latest_month, end=self.latest_month)
+            self.past_year_sales = cube.sum(by=('vehicle',), start=self.latest_month - 11)
+        else:
+            self.latest_month = None
+            self.latest_month_sales = self.past_year_sales = np.zeros(len(names), dtype=np.int64)
+
+        # Prefix index: every (word, vehicle) pair, sorted, so the words starting
+        # with a prefix are one contiguous run found by bisection
+        self._words = sorted({(word, vehicle) for vehicle, name in enumerate(self._names) for word in name.split()})
+
+        # Trigram indexes of the full names and of the model names alone, so a
+        # misspelled model matches without its make: the vehicles having each
+        # trigram, and the trigram count of each vehicle
+        self._trigram_indexes = [
+            self._trigram_index(self._names),
+            self._trigram_index([normalize(model) for model in self.models]),
+        ]
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def _trigram_index(names):
+        postings = {}
+        for vehicle, name in enumerate(names):
+            for gram in trigrams(name):
+                postings.setdefault(gram, []).append(vehicle)
+        postings = {gram: np.array(vehicles, dtype=np.intp) for gram, vehicles in postings.items()}
+        return postings, np.array([len(trigrams(name)) for name in names], dtype=np.intp)
+
+    def _prefix_matches(self, word):
+        """Return the vehicles with a word starting with `word`."""
+        start = bisect.bisect_left(self._words, (word,))
+        vehicles = set()
+        for name_word, vehicle in self._words[start:]:
+            if not name_word.startswith(word):
+                break
+            vehicles.add(vehicle)
+        return vehicles
+
+    def _similarity(self, query):
+        """Return the trigram similarity (Jaccard index) of `query` to every vehicle name, or model name if higher."""
+        grams = trigrams(query)
+        similarity = np.zeros(len(self), dtype=float)
+        for postings, trigram_counts in self._trigram_indexes:
+            matched = [postings[gram] for gram in grams if gram in postings]
+            if matched:
+                shared = np.bincount(np.concatenate(matched), minlength=len(self))
+                np.maximum(similarity, shared / (len(grams) + trigram_counts - shared), out=similarity)
+        return similarity
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Find the makes and models matching a query, best matches first.
+
+        Names starting with the query rank first, then names with a word
+        starting with every query word, in any order, then names similar to
+        the query (trigram similarity of at least MIN_SIMILARITY), which
+        tolerates typos, by similarity. Ties are ordered by past year sales.
+
+        Args:
+            query (str): Search text, e.g. 'ioniq 5' or 'tesla y'.
+            limit (int): Most results returned.
+
+        Returns:
+            list: Dicts with 'make', 'model', 'match' ('prefix', 'words' or 'fuzzy'),
+                'score' (1 for prefix and word matches, the similarity for fuzzy
+                matches), 'latest_month_sales' and 'past_year_sales'.
+        """
+        query = normalize(query)
+        if not query or not len(self):
+            return []
+
+        words = query.split()
+        matched = self._prefix_matches(words[0])
+        for word in words[1:]:
+            matched &= self._prefix_matches(word)
+        similarity = self._similarity(query)
+
+        candidates = []
+        for vehicle in matched:
+            match = 'prefix' if self._names[vehicle].startswith(query) else 'words'
+            candidates.append((0 if match == 'prefix' else 1, vehicle, match, 1.0))
+        for vehicle in np.flatnonzero(similarity >= MIN_SIMILARITY).tolist():
+            if vehicle not in matched:
+                candidates.append((2, vehicle, 'fuzzy', round(float(similarity[vehicle]), 3)))
+        candidates.sort(key=lambda c: (c[0], -c[3], -int(self.past_year_sales[c[1]]), c[1]))
+
+        return [
+            {
+                'make': self.makes[vehicle],
+                'model': self.models[vehicle],
+                'match': match,
+                'score': score,
+                'latest_month_sales': int(self.latest_month_sales[vehicle]),
+                'past_year_sales': int(self.past_year_sales[vehicle]),
+            }
+            for _, vehicle, match, score in candidates[:limit]
+        ]
@@ -0,0 +1,281 @@
+# serve.py
+#
+# Production entry point: loads the dataset once, then forks worker processes
+# that share it copy-on-write and accept connections on the same socket. Each
+# worker handles requests on a bounded pool of threads. Only the parent watches
+# the data file: when it changes, the parent reloads it once and replaces the
+# workers with new ones forked from the reloaded state.
+#
+#     python serve.py [--host 0.0.0.0] [--port 8000] [--workers 4] [--threads 4] [--interval 30]
+#
+# `python app.py` stays the development server, with the debugger and reloader.
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer
+
+# Worker processes, one per core by default
+WORKERS = os.cpu_count() or 1
+
+# Requests handled at once per worker. Aggregations hold the GIL, so more
+# threads only help with waiting on clients; CPU-bound work scales with workers.
+THREADS = 4
+
+# Seconds a stopping worker waits for the requests it is handling to finish
+GRACE_PERIOD = 30
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    WSGI server handling requests on a bounded pool of threads.
+
+    Once every thread is busy, connections are no longer accepted and wait in
+    the listen backlog, where an idle worker sharing the socket picks them up.
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=THREADS, **kwargs):
+        super().__init__(host, port, app, **kwargs)
+        self.threads = threads
+        self.pool = ThreadPoolExecutor(threads, thread_name_prefix='request')
+        self.slots = threading.BoundedSemaphore(threads)
+        self.connections = set()
+        self._connections_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        with self._connections_lock:
+            self.connections.add(request)
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self.connections.discard(request)
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def drain(self, timeout):
+        """
+        Wait for the requests being handled to finish, once serve_forever() has returned.
+
+        Connections stop reading further requests: idle keep-alive connections
+        close at once, busy ones once their response is sent, including
+        streamed ones.
+
+        Args:
+            timeout (float): Most seconds to wait.
+
+        Returns:
+            bool: Whether every request finished in time.
+        """
+        with self._connections_lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass  # Closed meanwhile
+
+        deadline = time.monotonic() + timeout
+        for _ in range(self.threads):
+            if not self.slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                return False
+        return True
+
+    def server_close(self):
+        super().server_close()
+        if hasattr(self, 'pool'):
+            self.pool.shutdown(wait=False)
+
+
+def load_app():
+    """
+    Import the app and load everything requests need before forking, so workers share it.
+
+    Returns:
+        Flask: The application.
+    """
+    from warmup import readiness, start_warm_up, wait_until_ready
+
+    # Warm up without the data file watcher, serve() reloads the data itself
+    start_warm_up(watch=False)
+    from app import app
+
+    if not wait_until_ready():
+        sys.exit(f"Error: Could not load the dataset: {readiness()['error']}")
+    app.debug = False
+    prepare(app)
+    return app
+
+
+def prepare(app):
+    """Answer every page and AJAX payload of the loaded dataset once, then freeze what was loaded."""
+    from data_loader import get_dataset
+    from prerender import artifact_requests
+
+    # Templates are compiled, the modules views import are loaded and the
+    # response cache is filled
+    client = app.test_client()
+    for path, params in artifact_requests(get_dataset().cube):
+        client.get(path, query_string=params)
+
+    # Keep the loaded objects out of garbage collection passes, which would
+    # otherwise write to their pages and unshare them in every worker
+    gc.unfreeze()
+    gc.collect()
+    gc.freeze()
+
+
+def run_worker(app, sock, threads):
+    """
+    Serve requests accepted on `sock` until SIGTERM, in a forked worker.
+
+    On SIGTERM the worker stops accepting connections, which the other
+    workers sharing the socket pick up, and finishes the requests it is
+    handling, for at most GRACE_PERIOD seconds.
+    """
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, threads=threads, fd=sock.fileno())
+
+    def stop():
+        # shutdown() waits for serve_forever() to return, so it cannot run in the signal handler
+        stopping.wait()
+        server.shutdown()
+
+    threading.Thread(target=stop, name='stop', daemon=True).start()
+    try:
+        server.serve_forever()
+        if not server.drain(GRACE_PERIOD):
+            print(f"Error: Worker {os.getpid()} stopped with requests still running after {GRACE_PERIOD} s")
+    finally:
+        server.server_close()
+
+
+def spawn(app, sock, threads):
+    """Fork a worker and return its pid."""
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            run_worker(app, sock, threads)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 0
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            status = 1
+        finally:
+            os._exit(status)
+    return pid
+
+
+def terminate(pids):
+    """Send SIGTERM to worker processes, skipping those that already exited."""
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def serve(host='0.0.0.0', port=8000, workers=WORKERS, threads=THREADS, interval=None):
+    """
+    Load the app, fork `workers` workers serving it on host:port, and restart any worker that exits.
+
+    Every worker has its own response cache and metrics, /metrics reports those
+    of the worker answering it. The data file is checked every `interval`
+    seconds (data_loader.WATCH_INTERVAL by default): when it changed, it is
+    reloaded in this process and new workers are forked before the previous
+    ones are stopped, so they keep sharing a single copy of the data. Runs until
+    SIGTERM or SIGINT, then stops the workers.
+    """
+    from data_loader import WATCH_INTERVAL, reload_dataset
+
+    app = load_app()
+    interval = WATCH_INTERVAL if interval is None else interval
+
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+
+    pids = set()
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        terminate(pids)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(workers):
+        pids.add(spawn(app, sock, threads))
+    print(f"Serving on http://{host}:{sock.getsockname()[1]} with {workers} workers of {threads} threads")
+
+    next_check = time.monotonic() + interval
+    while pids:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            if pid in pids:
+                pids.discard(pid)
+                if not stopping:
+                    print(f"Error: Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, restarting it")
+                    pids.add(spawn(app, sock, threads))
+            continue
+
+        if not stopping and time.monotonic() >= next_check:
+            if reload_dataset():
+                # Fork the new workers from the reloaded state, then retire the previous ones
+                prepare(app)
+                previous = set(pids)
+                pids.clear()
+                for _ in range(workers):
+                    pids.add(spawn(app, sock, threads))
+                terminate(previous)
+                print(f"Reloaded the data file, replaced {len(previous)} workers")
+            next_check = time.monotonic() + interval
+        time.sleep(0.2)
+
+    # Reap any retired worker still exiting
+    while True:
+        try:
+            os.wait()
+        except ChildProcessError:
+            break
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the dashboard with preforked workers.')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=WORKERS, help='Worker processes')
+    parser.add_argument('--threads', type=int, default=THREADS, help='Requests handled at once per worker')
+    parser.add_argument('--interval', type=float, help='Seconds between checks of the data file for changes')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads, args.interval)
+
+
+if __name__ == '__main__':
+    main()
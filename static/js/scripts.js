@@ -1,3 +1,70 @@
 // static/js/scripts.js
 
-// Add any global JavaScript functions here
\ No newline at end of file
+// Add any global JavaScript functions here
+
+// Render a figure returned by the server ({data, layout}) into an element.
+// A missing figure replaces the chart with emptyMessage.
+function renderFigure(elementId, figure, emptyMessage) {
+    var element = document.getElementById(elementId);
+    if (!figure) {
+        Plotly.purge(element);
+        element.innerHTML = '<p>' + emptyMessage + '</p>';
+        return;
+    }
+    if (!element.classList.contains('js-plotly-plot')) {
+        element.innerHTML = '';
+    }
+    Plotly.react(element, figure.data, figure.layout, {displayModeBar: false, responsive: true});
+}
+
+// Make and model search in the navigation bar, suggesting matches from
+// /api/search as you type and opening the page of the selected model.
+// jQuery is passed in, as some pages load another copy without Select2.
+(function ($) {
+    $(function () {
+        var select = $('#model-search');
+        if (!select.length) {
+            return;
+        }
+        select.select2({
+            placeholder: 'Search models',
+            minimumInputLength: 1,
+            width: '250px',
+            ajax: {
+                url: select.data('search-url'),
+                dataType: 'json',
+                delay: 150,
+                data: function (params) {
+                    return {q: params.term};
+                },
+                processResults: function (response) {
+                    return {
+                        results: response.results.map(function (result) {
+                            return {
+                                id: result.make + '\u0000' + result.model,
+                                text: result.make + ' ' + result.model,
+                                make: result.make,
+                                model: result.model,
+                                pastYearSales: result.past_year_sales
+                            };
+                        })
+                    };
+                }
+            },
+            templateResult: function (item) {
+                if (item.loading || item.pastYearSales === undefined) {
+                    return item.text;
+                }
+                return $('<span>').text(item.text).append(
+                    $('<small class="text-muted">').text(' ' + item.pastYearSales.toLocaleString() + ' in the past year')
+                );
+            }
+        });
+        select.on('select2:select', function (event) {
+            var item = event.params.data;
+            window.location.href = select.data('model-url')
+                .replace('__make__', encodeURIComponent(item.make))
+                .replace('__model__', encodeURIComponent(item.model));
+        });
+    });
+})(jQuery);
@@ -0,0 +1,132 @@
+# tests/test_data_loader.py
+
+import numpy as np
+import pytest
+
+from data_loader import CATEGORY_COLUMNS, load_columnar, load_data, save_columnar
+from sales_cube import SalesCube
+
+
+def mapped_file(values):
+    """Return the file backing `values` through a chain of array bases, None when in memory."""
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return values.filename
+        values = values.base
+    return None
+
+
+def test_columnar_cache_stays_memory_mapped(tmp_path):
+    directory = str(tmp_path / 'cache')
+    df = load_data()
+    save_columnar(df, directory)
+
+    loaded = load_columnar(directory)
+    # Using the frame like the app does must not replace its columns with in-memory copies
+    SalesCube(loaded)
+    loaded[loaded['Province/Territory'] == 'Quebec']
+
+    for column in loaded.columns:
+        if column == 'Month and Year':
+            continue
+        values = loaded[column].array.codes if column in CATEGORY_COLUMNS else loaded[column].to_numpy()
+        assert mapped_file(values) is not None, f"'{column}' is not memory-mapped"
+    assert loaded.equals(df)
+
+
+def test_columnar_cache_of_other_loader_code_is_not_loaded(tmp_path, monkeypatch):
+    import shutil
+
+    import data_loader
+
+    path = tmp_path / 'car_summary.csv'
+    shutil.copyfile(data_loader.DATA_FILE, path)
+    cache_dir = tmp_path / data_loader.CACHE_DIR
+
+    monkeypatch.setattr(data_loader, '_loader_fingerprint', lambda: 'before')
+    data_loader.load_dataset(str(path))
+    assert [entry.name.endswith('-before') for entry in cache_dir.iterdir()] == [True]
+
+    # A cache written by other loader code is not read, and is replaced
+    monkeypatch.setattr(data_loader, 'load_columnar', lambda directory: pytest.fail(f'Loaded {directory}'))
+    monkeypatch.setattr(data_loader, '_loader_fingerprint', lambda: 'after')
+    data_loader.load_dataset(str(path))
+    assert [entry.name.endswith('-after') for entry in cache_dir.iterdir()] == [True]
+
+
+def test_appended_rows_match_a_full_reload(tmp_path, monkeypatch):
+    import data_loader
+
+    with open(data_loader.DATA_FILE, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    path = tmp_path / 'car_summary.csv'
+    path.write_bytes(b''.join(lines[:-500]))
+    monkeypatch.setattr(data_loader, '_dataset', data_loader.load_dataset(str(path), use_cache=False))
+
+    # Touching the file without changing it keeps the dataset
+    current = data_loader.get_dataset()
+    path.write_bytes(path.read_bytes())
+    assert not data_loader.reload_dataset(str(path))
+    assert data_loader.get_dataset() is current
+
+    # Appended rows are parsed on their own and added to the current dataset
+    extended = []
+    extend = data_loader.Dataset.extend
+    monkeypatch.setattr(data_loader.Dataset, 'extend', lambda self, rows, **source: extended.append(len(rows)) or extend(self, rows, **source))
+    with open(path, 'ab') as f:
+        f.write(b''.join(lines[-500:]))
+    assert data_loader.reload_dataset(str(path))
+    assert extended == [500]
+
+    appended = data_loader.get_dataset()
+    full = data_loader.load_dataset(str(path), use_cache=False)
+    assert appended.version == full.version
+    assert np.array_equal(appended.cube.sum(by=('month', 'province', 'type', 'vehicle')),
+                          full.cube.sum(by=('month', 'province', 'type', 'vehicle')))
+
+
+def test_rows_with_blank_keys_are_skipped():
+    import io
+
+    import data_loader
+    from export import stream_csv
+
+    with open(data_loader.DATA_FILE, encoding='utf-8') as f:
+        header, first, second = f.readline(), f.readline(), f.readline()
+    blank = first.split(',')
+    blank[0] = ''
+    df = load_data(io.StringIO(header + ','.join(blank) + second))
+
+    assert len(df) == 1
+    assert SalesCube(df).sum() == df['Number of Cars'].sum()
+    # A missing name in a frame not built by load_data() is not exported under another name
+    df['Vehicle Make'] = df['Vehicle Make'].cat.set_categories(['Not a make'])
+    assert ''.join(stream_csv(df)).count('\n') == 1
+
+
+def test_watcher_keeps_polling_after_errors(monkeypatch):
+    import data_loader
+
+    class Stop(BaseException):
+        pass
+
+    calls = []
+
+    def failing_reload(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise PermissionError(13, 'Permission denied')
+        raise ValueError('Unparseable')
+
+    def sleep(seconds):
+        if len(calls) == 3:
+            raise Stop
+
+    monkeypatch.setattr(data_loader, 'reload_dataset', failing_reload)
+    monkeypatch.setattr(data_loader.time, 'sleep', sleep)
+
+    try:
+        data_loader._watch('sales.csv', 1)
+    except Stop:
+        pass
+    assert calls == ['sales.csv'] * 3
@@ -0,0 +1,38 @@
+# tests/test_figures.py
+#
+# The figure specs of figures.py must render the same charts the dashboard
+# built with plotly.express, see benchmarks/bench_figures.py for the builders.
+
+import pytest
+
+pytest.importorskip('plotly.express')
+
+from app import app  # noqa: E402
+from benchmarks.bench_figures import (  # noqa: E402
+    decode_typed_arrays, legacy_province_figure, legacy_sales_charts, province_chart, sales_charts,
+)
+from data_loader import get_dataset  # noqa: E402
+
+
+@pytest.mark.parametrize('legacy, spec', [
+    (legacy_sales_charts, sales_charts),
+    (legacy_province_figure, province_chart),
+], ids=['sales charts', 'province chart'])
+def test_figure_specs_match_plotly_express(legacy, spec):
+    cube = get_dataset().cube
+    with app.app_context():
+        for vehicle_type in ['All'] + cube.vehicle_types:
+            expected = decode_typed_arrays(legacy(cube, vehicle_type))
+            assert decode_typed_arrays(spec(cube, vehicle_type)) == expected, vehicle_type
+
+
+def test_large_province_chart_is_drawn_with_webgl_like_plotly_express():
+    from benchmarks.synthetic import synthetic_frame
+    from sales_cube import SalesCube
+
+    # More months than the source data, so the chart has over figures.WEBGL_POINTS points
+    cube = SalesCube(synthetic_frame(10))
+    with app.app_context():
+        spec = province_chart(cube)
+        assert decode_typed_arrays(spec) == decode_typed_arrays(legacy_province_figure(cube))
+    assert {trace['type'] for trace in spec['data']} == {'scattergl'}
@@ -0,0 +1,38 @@
+# tests/test_panels.py
+
+import numpy as np
+import pytest
+
+from app import app
+from data_loader import get_dataset
+from response_cache import response_cache
+from sales_tables import province_sales_table
+
+
+@pytest.fixture
+def client():
+    app.config['PRERENDERED'] = False
+    response_cache.clear()
+    yield app.test_client()
+    response_cache.clear()
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/panels', {'vehicle_type': 'Foo'}),
+    ('/panels', {'province': 'Foo'}),
+    ('/panels', {'panels': 'foo'}),
+    ('/update_graph', {'vehicle_type': 'Foo'}),
+    ('/get_province_sales_data', {'vehicle_type': 'Foo'}),
+])
+def test_unknown_filters_are_bad_requests(client, path, params):
+    response = client.get(path, query_string=params)
+    assert response.status_code == 400
+    assert 'Foo' in response.get_json()['error'] or 'foo' in response.get_json()['error']
+
+
+def test_province_table_without_sales():
+    cube = get_dataset().cube
+    table = province_sales_table(cube, pivot=np.zeros((len(cube.provinces), len(cube.months)), dtype=np.int64))
+    assert [row['Province'] for row in table['table_data']] == ['Canada']
+    assert table['table_data'][0]['1 Year'] == 0
+    assert len(table['last_6_months_labels']) == 6
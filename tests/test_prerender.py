@@ -0,0 +1,40 @@
+# tests/test_prerender.py
+
+import prerender
+from app import app
+from data_loader import get_dataset
+
+
+def test_artifacts_are_only_served_to_the_build_that_rendered_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(prerender, 'artifact_requests', lambda cube: [('/update_graph', [('vehicle_type', 'BEV')])])
+    directory = str(tmp_path)
+    manifest = prerender.build(app, directory)
+    key = prerender.artifact_key('/update_graph', [('vehicle_type', 'BEV')])
+    version = get_dataset().version
+
+    assert manifest['fingerprint'] == prerender.build_fingerprint()
+    assert prerender.find_artifact(key, version, directory) is not None
+
+    # After a deploy changing the code, the artifacts of the previous build are ignored
+    monkeypatch.setattr(prerender, 'build_fingerprint', lambda: 'another build')
+    assert prerender.find_artifact(key, version, directory) is None
+
+
+def test_build_only_replaces_its_own_files(tmp_path, monkeypatch):
+    import json
+    import stat
+
+    monkeypatch.setattr(prerender, 'artifact_requests', lambda cube: [('/update_graph', [('vehicle_type', 'BEV')])])
+    (tmp_path / '.git').mkdir()
+    (tmp_path / 'notes').mkdir()
+    (tmp_path / 'previous').mkdir()
+    (tmp_path / '.build-crashed').mkdir()
+    (tmp_path / prerender.MANIFEST_FILE).write_text(json.dumps({'version': 'previous', 'entries': {}}))
+
+    prerender.build(app, str(tmp_path))
+    version = get_dataset().version
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(['.git', 'notes', version, prerender.MANIFEST_FILE])
+    # Readable by a server running as another user
+    assert stat.S_IMODE((tmp_path / version).stat().st_mode) == 0o755
+    assert stat.S_IMODE((tmp_path / prerender.MANIFEST_FILE).stat().st_mode) == 0o644
@@ -0,0 +1,62 @@
+# tests/test_response_cache.py
+
+import pytest
+
+from app import app
+from response_cache import response_cache
+
+
+@pytest.fixture
+def client():
+    app.config['PRERENDERED'] = False
+    response_cache.clear()
+    yield app.test_client()
+    response_cache.clear()
+
+
+@pytest.mark.parametrize('path, other', [
+    ('/update_graph', {'vehicle_type': ['FCEV', 'All']}),
+    ('/panels', {'vehicle_type': ['FCEV', 'All']}),
+    ('/brand_sales/data', {'vehicle_type': ['FCEV', 'All'], 'province': ['Quebec', 'All']}),
+])
+def test_repeated_single_valued_filter_is_not_cached_as_unfiltered(client, path, other):
+    filtered = client.get(path, query_string=other).get_data()
+    unfiltered = client.get(path).get_data()
+    assert unfiltered != filtered
+    assert unfiltered == client.get(path, query_string={'vehicle_type': 'All'}).get_data()
+
+
+def test_repeated_multi_valued_filter_is_part_of_the_key(client):
+    both = client.get('/api/sales', query_string={'make': ['Tesla', 'Ford'], 'group_by': 'make'}).get_json()
+    tesla = client.get('/api/sales', query_string={'make': 'Tesla', 'group_by': 'make'}).get_json()
+    assert both['columns']['make'] == ['Ford', 'Tesla']
+    assert tesla['columns']['make'] == ['Tesla']
+
+
+@pytest.mark.parametrize('path, query', [
+    ('/brand_sales', {'province': 'Atlantis'}),
+    ('/brand_sales/data', {'vehicle_type': 'Hovercraft'}),
+    ('/api/sales', {'province': ['Quebec', 'Atlantis']}),
+])
+def test_unknown_filter_is_rejected_uncached(client, path, query):
+    assert client.get(path, query_string=query).status_code == 400
+    assert response_cache.stats()['entries'] == 0
+
+
+def test_json_body_that_is_not_an_object_has_no_parameters(client):
+    response = client.post('/api/sales', json=['province'])
+    assert response.status_code == 200
+    assert response.get_json() == client.get('/api/sales').get_json()
+
+
+def test_plotly_js_is_sent_precompressed(client):
+    from charts import plotly_js_url
+
+    with app.test_request_context():
+        url = plotly_js_url()
+    plain = client.get(url, headers={'Accept-Encoding': 'identity'})
+    gzipped = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert len(gzipped.get_data()) < len(plain.get_data()) / 2
+    assert gzipped.headers['Vary'] == plain.headers['Vary'] == 'Accept-Encoding'
+    assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']}).status_code == 304
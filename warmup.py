@@ -0,0 +1,110 @@
+# warmup.py
+#
+# Loads the dataset and the plotting stack in a background thread, so the app
+# can answer health checks while pandas, plotly and the data are still loading.
+# Only the standard library is imported here.
+
+import threading
+import time
+
+# Set once warm_up() has finished, successfully or not
+_done = threading.Event()
+_state = {'started': None, 'finished': None, 'error': None}
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def warm_up(watch=True):
+    """
+    Load everything the first request would otherwise wait for.
+
+    Imports the data layer, loads the dataset into the shared store, starts
+    watching the data file, then loads the plotly_white template of the charts
+    and compresses the plotly.js bundle.
+
+    Args:
+        watch (bool): Whether to start the data file watcher (see data_loader.start_watcher).
+    """
+    from charts import plotly_js_entry
+    from data_loader import get_dataset, start_watcher
+    from figures import template
+
+    get_dataset()
+    if watch:
+        start_watcher()
+    template()
+    plotly_js_entry()
+
+
+def _run(watch):
+    try:
+        warm_up(watch)
+    except Exception as e:
+        print(f"Error: Warm-up failed: {e}")
+        _state['error'] = str(e)
+    _state['finished'] = time.monotonic()
+    _done.set()
+
+
+def start_warm_up(watch=True):
+    """
+    Start warming up in a daemon thread, at most once per process: later calls are ignored.
+
+    Args:
+        watch (bool): Whether to watch the data file once loaded. serve.py
+            turns it off before importing the app, its parent process
+            reloads the data itself.
+    """
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _state['started'] = time.monotonic()
+            _thread = threading.Thread(target=_run, args=(watch,), name='warm-up', daemon=True)
+            _thread.start()
+
+
+def wait_until_ready(timeout=None):
+    """
+    Block until the warm-up has finished.
+
+    Args:
+        timeout (float): Seconds to wait at most, None to wait indefinitely.
+
+    Returns:
+        bool: Whether the app is ready to serve data.
+    """
+    if _done.wait(timeout) and _thread is not None:
+        # The thread only has to return, so no thread is left running, e.g. before a fork
+        _thread.join()
+    return readiness()['ready']
+
+
+def readiness():
+    """
+    Report whether the dataset is loaded and the data routes can be served.
+
+    Returns:
+        dict: 'ready', 'status' ('starting', 'warming', 'ready' or 'failed'), the
+            'rows' loaded, the warm-up 'error' if any and 'seconds' spent warming up.
+    """
+    started, finished, error = _state['started'], _state['finished'], _state['error']
+    rows = 0
+    if started is None:
+        status = 'starting'
+    elif not _done.is_set():
+        status = 'warming'
+    elif error:
+        status = 'failed'
+    else:
+        # Already imported by warm_up(); the dataset may have been reloaded since
+        from data_loader import get_dataset
+        rows = len(get_dataset().df)
+        status = 'ready' if rows else 'failed'
+        error = None if rows else 'The dataset is empty'
+    return {
+        'ready': status == 'ready',
+        'status': status,
+        'rows': rows,
+        'error': error,
+        'seconds': round((finished or time.monotonic()) - started, 3) if started is not None else None,
+    }